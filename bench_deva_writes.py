@@ -0,0 +1,166 @@
+"""
+bench_deva_writes.py
+Load test for deva's write path: N simulated Streamlit sessions, each on its
+own thread, recording stock inward and sales as fast as they can (with a
+balance read every --read-every writes), against
+
+  shared    the old layout: one module-level connection (check_same_thread
+            off, default journal) used by every session, commit per write
+  queued    deva_db.ShopStore: group-commit writer thread + per-thread WAL
+            readers
+
+Reports throughput, p50/p99 write latency, errors, and (queued) how many
+writes went into each commit. Afterwards the balance table is checked
+against the ledgers. Errors or drift on the queued path exit 1.
+
+Usage:
+    python bench_deva_writes.py --sessions 8 --ops 500
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import deva_db
+from deva_db import ShopStore
+
+MODELS = [f"Model {i}" for i in range(50)]
+
+
+class SharedConnection:
+    """deva's data functions as they were before deva_db."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        for sql in deva_db.SCHEMA:
+            self.conn.execute(sql)
+        self.conn.commit()
+
+    def _write(self, fn, *args):
+        with self.conn:
+            fn(self.conn, *args, datetime.now().strftime("%Y-%m-%d"))
+
+    def add_stock(self, model, qty, price):
+        self._write(deva_db._add_stock, model, qty, price)
+
+    def sell_mobile(self, model, qty, price):
+        self._write(deva_db._sell, model, qty, price)
+
+    def get_stock_balance(self):
+        return pd.read_sql("SELECT model, total_inward - total_sold AS balance FROM stock_balance", self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+class Queued:
+    batch_ms = deva_db.BATCH_MS
+
+    def __init__(self, path):
+        self.store = ShopStore(path, batch_ms=self.batch_ms)
+
+    def add_stock(self, model, qty, price):
+        self.store.add_stock(model, qty, price).result()
+
+    def sell_mobile(self, model, qty, price):
+        self.store.sell_mobile(model, qty, price).result()
+
+    def get_stock_balance(self):
+        return self.store.get_stock_balance()
+
+    def close(self):
+        self.store.close()
+
+
+def session(app, n, ops, read_every, latencies, errors, start):
+    start.wait()
+    for i in range(ops):
+        model = MODELS[(n * 7 + i) % len(MODELS)]
+        t0 = time.perf_counter()
+        try:
+            if i % 3 == 2:
+                app.sell_mobile(model, 1, 15000)
+            else:
+                app.add_stock(model, 2, 12000)
+            latencies.append(time.perf_counter() - t0)
+            if read_every and i % read_every == 0:
+                app.get_stock_balance()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+
+def drift(path):
+    """Models whose balance row disagrees with the ledgers."""
+    conn = sqlite3.connect(path)
+    try:
+        current = "SELECT model, total_inward, total_sold FROM stock_balance"
+        return conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT * FROM ({deva_db.BALANCE_FROM_LEDGERS}) EXCEPT {current}
+                UNION ALL
+                SELECT * FROM ({current} EXCEPT SELECT * FROM ({deva_db.BALANCE_FROM_LEDGERS}))
+            )""").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run(label, make, path, sessions, ops, read_every):
+    app = make(path)
+    latencies, errors = [], []
+    start = threading.Event()
+    threads = [threading.Thread(target=session, args=(app, n, ops, read_every, latencies, errors, start))
+               for n in range(sessions)]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    start.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    extra = ""
+    if isinstance(app, Queued):
+        w = app.store.writer
+        extra = f"  {w.writes / max(w.commits, 1):.1f} writes/commit"
+    app.close()
+
+    lat = sorted(latencies)
+    p50 = statistics.median(lat) * 1000 if lat else float("nan")
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000 if lat else float("nan")
+    bad = drift(path)
+    print(f"{label:<8}{len(lat) / elapsed:>10,.0f} writes/s  p50 {p50:6.2f} ms  p99 {p99:7.2f} ms  "
+          f"errors {len(errors)}  drift {bad}{extra}")
+    for msg in sorted(set(errors))[:3]:
+        print(f"        e.g. {msg}")
+    return not errors and not bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--ops", type=int, default=500, help="writes per session")
+    ap.add_argument("--read-every", type=int, default=10, help="balance read every N writes (0 = none)")
+    ap.add_argument("--batch-ms", type=float, default=deva_db.BATCH_MS, help="writer's group window")
+    ap.add_argument("--only", choices=["shared", "queued"])
+    args = ap.parse_args()
+    Queued.batch_ms = args.batch_ms
+
+    print(f"{args.sessions} sessions x {args.ops} writes")
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in (("shared", SharedConnection), ("queued", Queued)):
+            if args.only in (None, label):
+                clean = run(label, make, os.path.join(tmp, f"{label}.db"), args.sessions, args.ops, args.read_every)
+                ok &= clean or label == "shared"  # the old layout is expected to trip over itself
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+bench_ingest.py
+Compare the streaming loader (excel_ingest.read_stock_sheet) against the old
+pd.read_excel(file, skiprows=1) path on a synthetic export.
+
+Usage:
+    python bench_ingest.py --rows 50000 --extra-cols 30
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from excel_ingest import REQUIRED_COLS, read_stock_sheet
+from synthetic_data import make_workbook
+
+
+def old_path(payload):
+    return pd.read_excel(BytesIO(payload), skiprows=1)
+
+
+def new_path(payload):
+    return read_stock_sheet(BytesIO(payload), REQUIRED_COLS)
+
+
+def measure(fn, payload, repeat):
+    # time and memory are measured in separate runs; tracemalloc slows things down
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        frame = fn(payload)
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak, frame.memory_usage(deep=True).sum()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--extra-cols", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    payload = make_workbook(args.rows, args.extra_cols)
+    print(f"workbook: {args.rows} rows x {args.extra_cols + 4} cols, {len(payload) / 1e6:.1f} MB")
+    print(f"{'path':<22}{'best wall (s)':>15}{'peak mem (MB)':>16}{'frame (MB)':>12}")
+    for label, fn in [("pd.read_excel", old_path), ("read_stock_sheet", new_path)]:
+        wall, peak, size = measure(fn, payload, args.repeat)
+        print(f"{label:<22}{wall:>15.3f}{peak / 1e6:>16.1f}{size / 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+bench_pipeline.py
+Times each stage of the comparison pipeline on synthetic exports and checks
+the numbers against a stored baseline.
+
+Stages: read_excel (legacy pd.read_excel), ingest (excel_ingest), merge,
+to_numeric and sort (legacy pandas path), numeric_per_value and
+numeric_clean (one --rows column of raw cells with --dirty text, parsed
+cell by cell in Python vs numeric_clean.parse_numeric; both must agree),
+compare_engine, compare_fuzzy (fuzzy key matching; use --messy to respell
+some keys of file 2), and pdf. Each
+stage records its best wall time over --repeat runs and its peak traced
+memory (from a separate run, tracemalloc slows things down).
+
+Usage:
+    python bench_pipeline.py --rows 20000 --dirty 0.01 --save-baseline
+    python bench_pipeline.py --rows 20000 --dirty 0.01   # exits 1 on regression
+"""
+
+import argparse
+import gc
+import json
+import math
+import re
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from compare_engine import compare
+from excel_ingest import REQUIRED_COLS, read_stock_sheet
+from numeric_clean import JUNK, MINUS, NULL_TOKENS, parse_numeric
+from synthetic_data import make_pair, numeric_column
+
+KEYS = ["Stock Name", "Symbol"]
+NUMERIC = ["% Chg_1", "% Chg_2", "Price_1", "Price_2"]
+
+
+def legacy_read(payload):
+    return pd.read_excel(BytesIO(payload), skiprows=1)
+
+
+def legacy_to_numeric(merged):
+    merged = merged.copy()
+    for col in NUMERIC:
+        merged[col] = pd.to_numeric(merged[col], errors="coerce")
+    merged["chg_diff"] = merged["% Chg_2"] - merged["% Chg_1"]
+    merged["price_diff"] = merged["Price_2"] - merged["Price_1"]
+    return merged
+
+
+def per_value_numeric(values):
+    """The same rules as numeric_clean, one cell at a time (the fallback loop it replaces)."""
+    nulls, junk, minus = set(NULL_TOKENS), re.compile(JUNK), re.compile(MINUS)
+    out, bad = [], []
+    for v in values:
+        try:
+            out.append(float(v))
+            bad.append(False)
+            continue
+        except (TypeError, ValueError):
+            pass
+        text = "" if v is None else str(v).strip()
+        try:
+            num = float(junk.sub("", minus.sub("-", text)).strip("()"))
+            out.append(-num if text.startswith("(") and text.endswith(")") else num)
+            bad.append(False)
+        except ValueError:
+            out.append(math.nan)
+            bad.append(text.upper() not in nulls)
+    return np.array(out), np.array(bad)
+
+
+def build_stages(pair, column):
+    """(name, callable) per stage; inputs of later stages are prepared up front."""
+    from pdf_report import build_pdf
+
+    p1, p2 = pair
+    old1, old2 = legacy_read(p1), legacy_read(p2)
+    merged = pd.merge(old1, old2, on=KEYS, suffixes=("_1", "_2"))
+    numeric = legacy_to_numeric(merged)
+    new1 = read_stock_sheet(BytesIO(p1), REQUIRED_COLS)
+    new2 = read_stock_sheet(BytesIO(p2), REQUIRED_COLS)
+    result = compare(new1, new2).matched
+    slow, fast = per_value_numeric(column), parse_numeric(column)
+    if not (np.array_equal(slow[0], fast[0], equal_nan=True) and np.array_equal(slow[1], fast[1])):
+        raise AssertionError("numeric_clean disagrees with the per-value parse")
+    return [
+        ("read_excel", lambda: (legacy_read(p1), legacy_read(p2))),
+        ("ingest", lambda: (read_stock_sheet(BytesIO(p1), REQUIRED_COLS), read_stock_sheet(BytesIO(p2), REQUIRED_COLS))),
+        ("merge", lambda: pd.merge(old1, old2, on=KEYS, suffixes=("_1", "_2"))),
+        ("to_numeric", lambda: legacy_to_numeric(merged)),
+        ("sort", lambda: numeric.sort_values(by="chg_diff", ascending=False)),
+        ("numeric_per_value", lambda: per_value_numeric(column)),
+        ("numeric_clean", lambda: parse_numeric(column)),
+        ("compare_engine", lambda: compare(new1, new2)),
+        ("compare_fuzzy", lambda: compare(new1, new2, mode="fuzzy")),
+        ("pdf", lambda: build_pdf(result)),
+    ]
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wall_s": round(min(times), 6), "peak_mb": round(peak / 1e6, 3)}
+
+
+def find_regressions(stages, baseline, tolerance, min_delta_s=0.005):
+    """[(stage, metric, old, new)] for metrics that got worse by more than `tolerance`."""
+    out = []
+    for name, now in stages.items():
+        before = baseline.get("stages", {}).get(name)
+        if not before:
+            continue
+        if now["wall_s"] > before["wall_s"] * (1 + tolerance) and now["wall_s"] - before["wall_s"] > min_delta_s:
+            out.append((name, "wall_s", before["wall_s"], now["wall_s"]))
+        if now["peak_mb"] > before["peak_mb"] * (1 + tolerance) and now["peak_mb"] - before["peak_mb"] > 0.5:
+            out.append((name, "peak_mb", before["peak_mb"], now["peak_mb"]))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--overlap", type=float, default=0.9)
+    ap.add_argument("--dirty", type=float, default=0.0)
+    ap.add_argument("--messy", type=float, default=0.0, help="fraction of shared keys respelled in file 2")
+    ap.add_argument("--extra-cols", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--stages", nargs="+", help="only run these stages")
+    ap.add_argument("--results", default="bench_results.json")
+    ap.add_argument("--baseline", default="bench_baseline.json")
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown/growth, e.g. 0.2 = 20%%")
+    args = ap.parse_args()
+
+    pair = make_pair(args.rows, args.overlap, args.extra_cols, args.dirty, messy=args.messy)
+    stages = {}
+    column = numeric_column(args.rows, args.dirty)
+    for name, fn in build_stages(pair, column):
+        if args.stages and name not in args.stages:
+            continue
+        stages[name] = measure(fn, args.repeat)
+        print(f"{name:<18}{stages[name]['wall_s']:>10.3f} s{stages[name]['peak_mb']:>10.1f} MB", flush=True)
+
+    run = {
+        "meta": {
+            "rows": args.rows, "overlap": args.overlap, "dirty": args.dirty, "messy": args.messy,
+            "extra_cols": args.extra_cols,
+            "python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "stages": stages,
+    }
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    params = ("rows", "overlap", "dirty", "messy", "extra_cols")
+    if {k: baseline["meta"].get(k, 0.0 if k == "messy" else None) for k in params} != \
+            {k: run["meta"][k] for k in params}:
+        print("warning: baseline was recorded with different data parameters")
+    regressions = find_regressions(stages, baseline, args.tolerance)
+    for name, metric, old, new in regressions:
+        print(f"REGRESSION {name}.{metric}: {old} -> {new}")
+    if not regressions:
+        print("no regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+bench_shop_db.py
+Sale-recording throughput of the old connection-per-call helpers versus the
+pooled connection layer in shop_db.py.
+
+Usage:
+    python bench_shop_db.py --ops 2000 --products 500
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import mobile_shop_app as shop
+from shop_db import Database
+
+
+def legacy_record_sale(db_file, product_id, qty, customer, payment_mode):
+    """record_sale as it was before shop_db: a new connection per step."""
+    entry_date = datetime.now().strftime("%Y-%m-%d")
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    prod = conn.execute("SELECT * FROM products WHERE id=?", (product_id,)).fetchone()
+    conn.close()
+    total_amount = (prod["selling_price"] or 0.0) * qty
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute("SELECT stock_qty FROM products WHERE id=?", (product_id,))
+    if cur.fetchone()["stock_qty"] < qty:
+        conn.close()
+        return False
+    cur.execute("""INSERT INTO sales (product_id, qty, date, customer, payment_mode, total_amount)
+                   VALUES (?, ?, ?, ?, ?, ?)""", (product_id, qty, entry_date, customer, payment_mode, total_amount))
+    cur.execute("UPDATE products SET stock_qty = stock_qty - ? WHERE id=?", (qty, product_id))
+    conn.commit()
+    conn.close()
+    return True
+
+
+def seed(products):
+    shop.init_db()
+    with shop.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty) VALUES (?, ?, ?, ?, ?, ?)",
+            [("Brand", f"Model {i}", f"IMEI{i:015d}", 9000.0, 10000.0, 1_000_000) for i in range(products)])
+
+
+def run(label, fn, ops, products):
+    t0 = time.perf_counter()
+    for i in range(ops):
+        fn(i % products + 1)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28}{ops / elapsed:>12,.0f} sales/s  ({elapsed:.2f}s for {ops})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--ops", type=int, default=2000)
+    ap.add_argument("--products", type=int, default=500)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # legacy: default rollback journal, one connection per step
+        legacy_file = os.path.join(tmp, "legacy.db")
+        shop.db = Database(legacy_file)
+        seed(args.products)
+        shop.db.execute("PRAGMA journal_mode=DELETE")
+        shop.db.close()
+        run("connection per call", lambda pid: legacy_record_sale(legacy_file, pid, 1, "Bench", "Cash"),
+            args.ops, args.products)
+
+        shop.db = Database(os.path.join(tmp, "pooled.db"))
+        seed(args.products)
+        run("pooled connection (WAL)", lambda pid: shop.record_sale(pid, 1, "Bench", "Cash"),
+            args.ops, args.products)
+        shop.db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+compare_engine.py
+Key-indexed comparison of two stock snapshots.
+
+File 1 is indexed once: Symbol and Stock Name are encoded as categorical
+integer codes and combined into a single int64 key held in a hash index.
+File 2 rows are then mapped onto file 1 positions with one vectorised
+lookup, and the differences are plain array arithmetic over the aligned
+numeric columns. ComparisonEngine keeps the index of the last file 1 so that
+changing only file 2 recomputes just that side.
+
+The exact join is the default. mode="normalized" or "fuzzy" hands the rows
+it leaves over to symbol_match, and the result then also carries match
+method, confidence and file 1's name and symbol for every row.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from excel_ingest import widen
+from symbol_match import MODES, Keys, match_leftovers
+
+KEY_COLS = ["Stock Name", "Symbol"]
+VALUE_COLS = ["% Chg", "Price"]
+RESULT_COLS = ["Stock Name", "Symbol",
+               "% Chg_1", "% Chg_2", "chg_diff",
+               "Price_1", "Price_2", "price_diff"]
+MATCH_COLS = ["match", "confidence", "Stock Name_1", "Symbol_1"]
+
+
+def _as_float(values) -> np.ndarray:
+    return widen(pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(na_value=np.nan))
+
+
+class KeyIndex:
+    """Hash index from (Stock Name, Symbol) to row positions of one snapshot.
+
+    Rows with a missing key never match. When a key occurs more than once the
+    first row wins and the others are reported as unmatched.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        symbols = pd.Categorical(frame["Symbol"])
+        names = pd.Categorical(frame["Stock Name"])
+        self.symbols = symbols.categories
+        self.names = names.categories
+        keys = self._combine(symbols.codes, names.codes)
+
+        valid = np.flatnonzero(keys >= 0)
+        _, first = np.unique(keys[valid], return_index=True)
+        self.positions = valid[first]
+        self._lookup = pd.Index(keys[self.positions])
+        self.values = {col: _as_float(frame[col]) for col in VALUE_COLS}
+        self._keys = None
+
+    def keys(self) -> Keys:
+        """Normalized keys for looser matching, built on first use."""
+        if self._keys is None:
+            self._keys = Keys(self.frame)
+        return self._keys
+
+    def _combine(self, symbol_codes, name_codes) -> np.ndarray:
+        keys = symbol_codes.astype(np.int64) * max(len(self.names), 1) + name_codes
+        keys[(symbol_codes < 0) | (name_codes < 0)] = -1
+        return keys
+
+    def __len__(self):
+        return len(self.frame)
+
+    def lookup(self, frame: pd.DataFrame) -> np.ndarray:
+        """Row position in the indexed snapshot for every row of `frame` (-1 if absent)."""
+        symbol_codes = self.symbols.get_indexer(pd.Index(frame["Symbol"]))
+        name_codes = self.names.get_indexer(pd.Index(frame["Stock Name"]))
+        keys = self._combine(symbol_codes, name_codes)
+        hit = self._lookup.get_indexer(keys)
+        out = np.full(len(frame), -1, dtype=np.int64)
+        found = (keys >= 0) & (hit >= 0)
+        out[found] = self.positions[hit[found]]
+        return out
+
+
+class ComparisonResult:
+    def __init__(self, matched: pd.DataFrame, left_only: pd.DataFrame, right_only: pd.DataFrame):
+        self.matched = matched
+        self.left_only = left_only
+        self.right_only = right_only
+
+
+def compare(left: pd.DataFrame, right: pd.DataFrame, index: KeyIndex = None, mode="exact") -> ComparisonResult:
+    """Compare two snapshots; `index` may be a prebuilt KeyIndex of `left`.
+    `mode` is one of symbol_match.MODES."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown match mode: {mode}")
+    if index is None:
+        index = KeyIndex(left)
+    pos = index.lookup(right)
+    hit = pos >= 0
+    lpos = pos[hit]
+    rpos = np.flatnonzero(hit)
+    extra = None
+    if mode != "exact":
+        used = np.zeros(len(left), dtype=bool)
+        used[lpos] = True
+        extra = match_leftovers(index.keys(), Keys(right), np.flatnonzero(~used), np.flatnonzero(~hit),
+                                fuzzy=mode == "fuzzy")
+        hit[extra.rpos] = True
+        lpos = np.concatenate([lpos, extra.lpos])
+        rpos = np.concatenate([rpos, extra.rpos])
+
+    chg1 = index.values["% Chg"][lpos]
+    price1 = index.values["Price"][lpos]
+    chg2 = _as_float(right["% Chg"])[rpos]
+    price2 = _as_float(right["Price"])[rpos]
+    chg_diff = chg2 - chg1
+    price_diff = price2 - price1
+
+    # descending by chg_diff, NaN last (same order as sort_values(ascending=False))
+    order = np.argsort(-chg_diff, kind="stable")
+    lpos, rpos = lpos[order], rpos[order]
+    matched = pd.DataFrame({
+        "Stock Name": right["Stock Name"].to_numpy()[rpos],
+        "Symbol": right["Symbol"].to_numpy()[rpos],
+        "% Chg_1": chg1[order],
+        "% Chg_2": chg2[order],
+        "chg_diff": chg_diff[order],
+        "Price_1": price1[order],
+        "Price_2": price2[order],
+        "price_diff": price_diff[order],
+    }, columns=RESULT_COLS)
+    if extra is not None:
+        exact = len(lpos) - len(extra)
+        matched["match"] = np.concatenate([np.full(exact, "exact", dtype=object), extra.method])[order]
+        matched["confidence"] = np.concatenate([np.ones(exact), extra.confidence])[order]
+        matched["Stock Name_1"] = left["Stock Name"].to_numpy()[lpos]
+        matched["Symbol_1"] = left["Symbol"].to_numpy()[lpos]
+
+    used = np.zeros(len(left), dtype=bool)
+    used[lpos] = True
+    left_only = left.iloc[np.flatnonzero(~used)].reset_index(drop=True)
+    right_only = right.iloc[np.flatnonzero(~hit)].reset_index(drop=True)
+    return ComparisonResult(matched, left_only, right_only)
+
+
+class ComparisonEngine:
+    """Reuses the index of file 1 across comparisons and memoises recent results.
+
+    Snapshots are identified by caller supplied keys (e.g. upload content
+    hashes), so an unchanged file is never re-indexed.
+    """
+
+    def __init__(self, max_results=8):
+        self.max_results = max_results
+        self._left_key = None
+        self._index = None
+        self._results = OrderedDict()
+
+    def compare(self, left_key, left: pd.DataFrame, right_key, right: pd.DataFrame, mode="exact") -> ComparisonResult:
+        if left_key != self._left_key or self._index is None:
+            self._left_key = left_key
+            self._index = KeyIndex(left)
+            self._results.clear()
+        key = (right_key, mode)
+        result = self._results.get(key)
+        if result is None:
+            result = compare(left, right, self._index, mode)
+            self._results[key] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+        return result
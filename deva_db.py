@@ -0,0 +1,131 @@
+"""
+deva_db.py
+Data layer for the deva Streamlit app.
+
+Streamlit runs every browser session on its own thread, so deva can't share
+one connection and cursor between them. ShopStore splits the two sides:
+writes (stock inward, sales, balance rebuild) go to a GroupCommitWriter,
+which commits all the writes queued up while its last commit ran as one
+transaction, and reads use a per-thread WAL connection from shop_db.Database,
+so they never wait on a writer. Each write returns a Future; the UI waits on
+it, so a success message is only shown after the commit.
+
+With SQL_PROFILE=1 both sides are profiled (sql_profiler.py) and the reads
+are timed as UI paths.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from shop_db import Database
+from sql_profiler import timed
+from sqlite_writer import GroupCommitWriter
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS stock (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model TEXT,
+        quantity INTEGER,
+        price REAL,
+        date TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model TEXT,
+        quantity INTEGER,
+        price REAL,
+        date TEXT
+    )""",
+    # running inward/sold totals per model, kept in step with the two ledgers above
+    """CREATE TABLE IF NOT EXISTS stock_balance (
+        model TEXT PRIMARY KEY,
+        total_inward INTEGER NOT NULL DEFAULT 0,
+        total_sold INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+]
+
+BATCH_MS = 0.0  # group = whatever queued during the last commit; see sqlite_writer
+
+BALANCE_FROM_LEDGERS = """
+    SELECT model, SUM(inward) AS total_inward, SUM(sold) AS total_sold FROM (
+        SELECT model, quantity AS inward, 0 AS sold FROM stock
+        UNION ALL
+        SELECT model, 0, quantity FROM sales
+    ) GROUP BY model
+"""
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+# ---- writes: run on the writer thread, inside its group transaction ----
+def _init_schema(conn):
+    has_balance = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='stock_balance'").fetchone()
+    for sql in SCHEMA:
+        conn.execute(sql)
+    if not has_balance:
+        _rebuild_balance(conn)  # first run on an existing database
+
+
+def _add_stock(conn, model, qty, price, date):
+    conn.execute("INSERT INTO stock (model, quantity, price, date) VALUES (?, ?, ?, ?)", (model, qty, price, date))
+    conn.execute("""INSERT INTO stock_balance (model, total_inward) VALUES (?, ?)
+                    ON CONFLICT(model) DO UPDATE SET total_inward = total_inward + excluded.total_inward""",
+                 (model, qty))
+
+
+def _sell(conn, model, qty, price, date):
+    conn.execute("INSERT INTO sales (model, quantity, price, date) VALUES (?, ?, ?, ?)", (model, qty, price, date))
+    conn.execute("""INSERT INTO stock_balance (model, total_sold) VALUES (?, ?)
+                    ON CONFLICT(model) DO UPDATE SET total_sold = total_sold + excluded.total_sold""",
+                 (model, qty))
+
+
+def _rebuild_balance(conn):
+    current = "SELECT model, total_inward, total_sold FROM stock_balance"
+    fixed = conn.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT model FROM (SELECT * FROM ({BALANCE_FROM_LEDGERS}) EXCEPT {current})
+            UNION
+            SELECT model FROM ({current} EXCEPT SELECT * FROM ({BALANCE_FROM_LEDGERS}))
+        )
+    """).fetchone()[0]
+    conn.execute("DELETE FROM stock_balance")
+    conn.execute(f"INSERT INTO stock_balance (model, total_inward, total_sold) {BALANCE_FROM_LEDGERS}")
+    return fixed
+
+
+class ShopStore:
+    def __init__(self, path="mobile_shop.db", batch_ms=BATCH_MS):
+        self.path = path
+        self.writer = GroupCommitWriter(path, batch_ms=batch_ms)
+        self.writer.call(_init_schema)
+        self.db = Database(path)
+
+    # ---- writes (return Futures) ----
+    def add_stock(self, model, qty, price):
+        return self.writer.submit(_add_stock, model, qty, price, _today())
+
+    def sell_mobile(self, model, qty, price):
+        return self.writer.submit(_sell, model, qty, price, _today())
+
+    def rebuild_stock_balance(self):
+        """Future of the number of models whose balance was wrong."""
+        return self.writer.submit(_rebuild_balance)
+
+    # ---- reads (this thread's connection) ----
+    @timed("get_stock_balance")
+    def get_stock_balance(self):
+        # one row per model, including models that were sold but never inwarded
+        return pd.read_sql("""SELECT model, total_inward, total_sold, total_inward - total_sold AS balance
+                              FROM stock_balance ORDER BY model""", self.db.connection())
+
+    @timed("get_today_sales")
+    def get_today_sales(self):
+        return pd.read_sql("SELECT * FROM sales WHERE date = ?", self.db.connection(), params=(_today(),))
+
+    def close(self):
+        self.writer.close()
+        self.db.close()
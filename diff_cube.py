@@ -0,0 +1,108 @@
+"""
+diff_cube.py
+N-way comparison of daily exports as a snapshot x symbol x metric array.
+
+All snapshots are aligned on Symbol in one factorize pass over the
+concatenated symbol columns, so consecutive and cumulative deltas for every
+day are single vectorised operations instead of N-1 pairwise merges.
+"""
+
+import numpy as np
+import pandas as pd
+
+from excel_ingest import widen
+
+METRICS = ["% Chg", "Price"]
+VIEWS = ["values", "consecutive", "cumulative"]
+
+
+class DiffCube:
+    """values[snapshot, symbol, metric], NaN where a symbol is absent from a snapshot.
+
+    present[snapshot, symbol] tells absent symbols apart from blank cells.
+    """
+
+    def __init__(self, snapshots, symbols: pd.Index, names: np.ndarray, values: np.ndarray, present: np.ndarray):
+        self.snapshots = list(snapshots)
+        self.symbols = symbols
+        self.names = names
+        self.values = values
+        self.present = present
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def consecutive(self) -> np.ndarray:
+        """Day-over-day deltas, shape (n_snapshots - 1, n_symbols, n_metrics)."""
+        return np.diff(self.values, axis=0)
+
+    def cumulative(self) -> np.ndarray:
+        """Change against each symbol's first observed snapshot."""
+        present = ~np.isnan(self.values)
+        first = present.argmax(axis=0)[np.newaxis]
+        base = np.take_along_axis(self.values, first, axis=0)
+        return self.values - base
+
+    def coverage(self) -> np.ndarray:
+        """Number of snapshots each symbol appears in."""
+        return self.present.sum(axis=0)
+
+    def to_frame(self, metric="% Chg", view="values") -> pd.DataFrame:
+        """Wide table: one row per symbol, one column per snapshot (or transition)."""
+        m = METRICS.index(metric)
+        if view == "consecutive":
+            data = self.consecutive()[:, :, m]
+            columns = [f"{a} → {b}" for a, b in zip(self.snapshots, self.snapshots[1:])]
+        elif view == "cumulative":
+            data = self.cumulative()[:, :, m]
+            columns = list(self.snapshots)
+        else:
+            data = self.values[:, :, m]
+            columns = list(self.snapshots)
+        frame = pd.DataFrame(data.T, columns=columns)
+        frame.insert(0, "Symbol", self.symbols)
+        frame.insert(0, "Stock Name", self.names)
+        return frame
+
+    def summary(self) -> pd.DataFrame:
+        """First/last value and total change per symbol, largest % Chg move first."""
+        first = self.present.argmax(axis=0)
+        last = len(self.snapshots) - 1 - self.present[::-1].argmax(axis=0)
+        cols = np.arange(len(self.symbols))
+        frame = pd.DataFrame({"Stock Name": self.names, "Symbol": self.symbols, "snapshots": self.coverage()})
+        for m, metric in enumerate(METRICS):
+            start = self.values[first, cols, m]
+            end = self.values[last, cols, m]
+            frame[f"{metric}_first"] = start
+            frame[f"{metric}_last"] = end
+            frame[f"{metric}_change"] = end - start
+        return frame.sort_values(by="% Chg_change", ascending=False, ignore_index=True)
+
+
+def build_cube(frames, labels=None) -> DiffCube:
+    """Align parsed snapshots (in chronological order) on Symbol."""
+    if labels is None:
+        labels = [f"#{i + 1}" for i in range(len(frames))]
+    lengths = np.array([len(f) for f in frames])
+    symbols = np.concatenate([f["Symbol"].to_numpy(dtype=object) for f in frames])
+    names = np.concatenate([f["Stock Name"].to_numpy(dtype=object) for f in frames])
+    codes, uniques = pd.factorize(symbols, use_na_sentinel=True)
+
+    snapshot = np.repeat(np.arange(len(frames)), lengths)
+    keep = codes >= 0
+    values = np.full((len(frames), len(uniques), len(METRICS)), np.nan)
+    present = np.zeros((len(frames), len(uniques)), dtype=bool)
+    present[snapshot[keep], codes[keep]] = True
+    for m, metric in enumerate(METRICS):
+        column = np.concatenate([widen(pd.to_numeric(f[metric], errors="coerce").to_numpy(na_value=np.nan))
+                                 for f in frames])
+        values[snapshot[keep], codes[keep], m] = column[keep]
+
+    # name from the latest snapshot a symbol appears in
+    rev_codes = codes[::-1]
+    _, last_seen = np.unique(rev_codes, return_index=True)
+    last_seen = last_seen[rev_codes[last_seen] >= 0]
+    latest_names = np.empty(len(uniques), dtype=object)
+    latest_names[rev_codes[last_seen]] = names[::-1][last_seen]
+    return DiffCube(labels, pd.Index(uniques, name="Symbol"), latest_names, values, present)
@@ -0,0 +1,116 @@
+"""
+excel_ingest.py
+Streaming, read-only loader for the stock comparison workbooks.
+
+Rows are pulled through openpyxl's read-only mode one at a time and only the
+columns we actually compare are kept. The header row is located by scanning
+the top of the sheet (exports usually carry a title row above it), and the
+numeric columns are parsed with numeric_clean (so "1,234.50" or "(1.2)" are
+read, and unreadable cells are flagged in frame.attrs) and stored in the
+smallest float dtype that keeps their precision.
+"""
+
+from io import BytesIO
+from operator import itemgetter
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from numeric_clean import parse_numeric, record_bad
+
+REQUIRED_COLS = ["Stock Name", "Symbol", "% Chg", "Price"]
+TEXT_COLS = ["Stock Name", "Symbol"]
+NUMERIC_COLS = ["% Chg", "Price"]
+
+# how far down the sheet we look for the header row
+HEADER_SCAN_ROWS = 20
+# float32 is only used when widening back (rounded to this many decimals)
+# restores every value exactly
+FLOAT32_DECIMALS = 4
+# bump when parsing changes, so cached parses of the same bytes are redone
+PARSE_VERSION = 2
+
+
+class MissingColumnsError(ValueError):
+    def __init__(self, missing):
+        self.missing = list(missing)
+        super().__init__("Missing required columns: " + ", ".join(self.missing))
+
+    def __reduce__(self):
+        # keep the column list intact when raised inside a worker process
+        return (MissingColumnsError, (self.missing,))
+
+
+def _find_header(ws, columns):
+    """Return (row_number, {column: position}) of the first row holding all columns."""
+    best_missing = list(columns)
+    for row_no, row in enumerate(ws.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True), start=1):
+        labels = {}
+        for pos, value in enumerate(row):
+            if value is not None:
+                labels.setdefault(str(value).strip(), pos)
+        missing = [c for c in columns if c not in labels]
+        if not missing:
+            return row_no, {c: labels[c] for c in columns}
+        if len(missing) < len(best_missing):
+            best_missing = missing
+    raise MissingColumnsError(best_missing)
+
+
+def widen(values) -> np.ndarray:
+    """float64 copy of a numeric column, undoing float32 storage noise."""
+    arr = np.asarray(values)
+    if arr.dtype == np.float32:
+        return np.round(arr.astype(np.float64), FLOAT32_DECIMALS)
+    return arr.astype(np.float64)
+
+
+def _smallest_float(arr) -> np.ndarray:
+    small = arr.astype(np.float32)
+    with np.errstate(invalid="ignore", over="ignore"):
+        if np.allclose(widen(small), arr, rtol=0, atol=1e-9, equal_nan=True):
+            return small
+    return arr
+
+
+def read_stock_sheet(source, columns=REQUIRED_COLS, sheet_name=None) -> pd.DataFrame:
+    """Read `columns` from an uploaded workbook (path, bytes buffer or file-like)."""
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.active
+        header_row, positions = _find_header(ws, columns)
+
+        # only materialise the cells between the first and last wanted column
+        first = min(positions.values())
+        last = max(positions.values())
+        pick = itemgetter(*(positions[c] - first for c in columns))
+        if len(columns) == 1:
+            single = pick
+            pick = lambda row: (single(row),)
+        rows = []
+        for row in ws.iter_rows(min_row=header_row + 1, min_col=first + 1, max_col=last + 1, values_only=True):
+            picked = pick(row)
+            if any(v is not None for v in picked):
+                rows.append(picked)
+    finally:
+        wb.close()
+
+    cols = list(zip(*rows)) if rows else [() for _ in columns]
+    data, bad = {}, {}
+    for name, values in zip(columns, cols):
+        if name in NUMERIC_COLS:
+            arr, bad[name] = parse_numeric(values)
+            data[name] = _smallest_float(arr)
+        else:
+            data[name] = pd.array([None if v is None else str(v) for v in values], dtype="string")
+    frame = pd.DataFrame(data)
+    for name, values in zip(columns, cols):
+        if name in bad:
+            record_bad(frame, name, bad[name], values)
+    return frame
+
+
+def read_stock_bytes(data: bytes, columns=REQUIRED_COLS) -> pd.DataFrame:
+    return read_stock_sheet(BytesIO(data), columns)
+
@@ -0,0 +1,119 @@
+"""
+exports.py
+On-demand exports of comparison results.
+
+Nothing is rendered until a download is actually requested. Rendered files
+are memoised per (result content hash, format, options) in a small
+size-bounded LRU, so clicking the same download twice doesn't redo the work.
+Writers stream to the target in chunks: CSV is written a slice at a time,
+XLSX uses openpyxl's write-only mode, Parquet goes through pyarrow, and the
+PDF comes from pdf_report (imported only when a PDF is requested).
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+CHUNK_ROWS = 50_000
+
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "xlsx": ("Excel (XLSX)", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "pdf": ("PDF", "pdf", "application/pdf"),
+}
+PDF_MODES = {"full": "Full table", "movers": "Top / bottom movers"}
+
+
+def frame_key(frame: pd.DataFrame) -> str:
+    """Content hash of a result frame (values and column names, not the index)."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update("\0".join(map(str, frame.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+# ------------------------
+# Writers (out is a binary file object or a path)
+# ------------------------
+def write_csv(frame: pd.DataFrame, out, chunk_rows=CHUNK_ROWS):
+    if isinstance(out, str):
+        with open(out, "wb") as f:
+            return write_csv(frame, f, chunk_rows)
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    try:
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            frame.iloc[start:start + chunk_rows].to_csv(text, index=False, header=start == 0)
+        text.flush()
+    finally:
+        text.detach()  # leave `out` open for the caller
+
+
+def write_xlsx(frame: pd.DataFrame, out, chunk_rows=CHUNK_ROWS, sheet_title="Comparison"):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    ws.append([str(c) for c in frame.columns])
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows].astype(object)
+        for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(out)
+
+
+def write_parquet(frame: pd.DataFrame, out):
+    frame.to_parquet(out, index=False)
+
+
+def write_pdf(frame: pd.DataFrame, out, mode="full", top_n=25):
+    from pdf_report import build_pdf
+
+    build_pdf(frame, out, mode=mode, top_n=top_n)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "parquet": write_parquet, "pdf": write_pdf}
+
+
+def export(frame: pd.DataFrame, fmt: str, out, **options):
+    """Write `frame` as `fmt` to `out` (path or binary file object)."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    WRITERS[fmt](frame, out, **options)
+    return out
+
+
+def render(frame: pd.DataFrame, fmt: str, **options) -> bytes:
+    buf = io.BytesIO()
+    export(frame, fmt, buf, **options)
+    return buf.getvalue()
+
+
+class ExportCache:
+    """Memoises rendered exports per result hash, bounded by total bytes."""
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, frame: pd.DataFrame, fmt: str, result_key=None, **options) -> bytes:
+        key = (result_key or frame_key(frame), fmt, tuple(sorted(options.items())))
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                return data
+        data = render(frame, fmt, **options)
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = data
+                self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+        return data
@@ -0,0 +1,172 @@
+"""
+ingest_scheduler.py
+Parses uploaded workbooks (optionally every sheet of each) in a pool of
+worker processes.
+
+openpyxl parsing is pure-Python and CPU bound, so threads don't help. Each
+job runs read_stock_sheet in a worker and ships the result back as an Arrow
+IPC buffer rather than a pickled DataFrame, which keeps the transfer cost
+small next to the parse itself. Every job is timed so the UI can show the
+per-file cost and the speedup over a serial run.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+
+from excel_ingest import REQUIRED_COLS, MissingColumnsError, read_stock_sheet
+from numeric_clean import concat
+
+
+# ------------------------
+# Worker side
+# ------------------------
+def _to_ipc(frame: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(buf: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(buf).read_all().to_pandas()
+
+
+def _parse_job(data: bytes, columns, sheet_name, skip_missing):
+    t0 = time.perf_counter()
+    try:
+        frame = read_stock_sheet(BytesIO(data), columns, sheet_name)
+    except MissingColumnsError:
+        if not skip_missing:
+            raise
+        frame = None
+    seconds = time.perf_counter() - t0
+    payload = None if frame is None else _to_ipc(frame)
+    rows = 0 if frame is None else len(frame)
+    return payload, seconds, rows, os.getpid()
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+# ------------------------
+# Scheduler
+# ------------------------
+class ParseStat:
+    def __init__(self, name, sheet, rows, seconds, pid):
+        self.name = name
+        self.sheet = sheet
+        self.rows = rows
+        self.seconds = seconds
+        self.pid = pid
+
+
+class IngestReport:
+    def __init__(self, frames, stats, wall, workers):
+        self.frames = frames
+        self.stats = stats
+        self.wall = wall
+        self.workers = workers
+
+    @property
+    def parse_seconds(self):
+        return sum(s.seconds for s in self.stats)
+
+    @property
+    def speedup(self):
+        return self.parse_seconds / self.wall if self.wall else 1.0
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "file": [s.name for s in self.stats],
+            "sheet": [s.sheet or "(active)" for s in self.stats],
+            "rows": [s.rows for s in self.stats],
+            "parse_s": [round(s.seconds, 3) for s in self.stats],
+            "worker_pid": [s.pid for s in self.stats],
+        })
+
+
+def _mp_context():
+    # forking a threaded server (Streamlit) is unsafe, so never use plain fork
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class IngestScheduler:
+    """Long-lived process pool; create once per server and reuse across reruns."""
+
+    def __init__(self, max_workers=None, columns=REQUIRED_COLS):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.columns = columns
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context())
+        return self._pool
+
+    def start(self):
+        """Start the workers now so the first parse doesn't pay for interpreter startup."""
+        if self.max_workers > 1:
+            list(self._get_pool().map(_warm_up, range(self.max_workers)))
+        return self
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def parse(self, payloads, names=None, all_sheets=False) -> IngestReport:
+        """Parse each payload (bytes of an .xlsx) and return frames in input order.
+
+        With all_sheets, every sheet that has the required columns is parsed
+        as its own job and the sheets of one file are concatenated.
+        """
+        if names is None:
+            names = [f"file {i + 1}" for i in range(len(payloads))]
+        t0 = time.perf_counter()
+        jobs = []  # (file index, sheet name)
+        for i, data in enumerate(payloads):
+            if all_sheets:
+                wb = openpyxl.load_workbook(BytesIO(data), read_only=True)
+                jobs.extend((i, sheet) for sheet in wb.sheetnames)
+                wb.close()
+            else:
+                jobs.append((i, None))
+
+        if len(jobs) <= 1 or self.max_workers == 1:
+            results = [_parse_job(payloads[i], self.columns, sheet, all_sheets) for i, sheet in jobs]
+        else:
+            results = self._run_pooled(payloads, jobs, all_sheets)
+
+        parts = [[] for _ in payloads]
+        stats = []
+        for (i, sheet), (payload, seconds, rows, pid) in zip(jobs, results):
+            stats.append(ParseStat(names[i], sheet, rows, seconds, pid))
+            if payload is not None:
+                parts[i].append(_from_ipc(payload))
+        frames = []
+        for i, frame_parts in enumerate(parts):
+            if not frame_parts:
+                raise MissingColumnsError(self.columns)
+            frames.append(frame_parts[0] if len(frame_parts) == 1 else concat(frame_parts))
+        return IngestReport(frames, stats, time.perf_counter() - t0, min(self.max_workers, len(jobs)))
+
+    def _run_pooled(self, payloads, jobs, all_sheets):
+        try:
+            pool = self._get_pool()
+            futures = [pool.submit(_parse_job, payloads[i], self.columns, sheet, all_sheets) for i, sheet in jobs]
+            return [f.result() for f in futures]
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM); start a fresh pool for the next call
+            self._pool = None
+            raise
@@ -5,192 +5,166 @@ Starter PC Mobile Shop Management (Tkinter + SQLite)
 Features:
 - Products: add / edit / delete
 - Inward (purchases) -> increases stock
+- Bulk import of products / purchase invoices from CSV or Excel (shop_import.py)
 - Outward (sales) -> decreases stock, checks stock qty
+- Type-ahead product search (FTS5) and IMEI scan in the entry windows
 - Dashboard: today's sales total, total stock value
-- Reports: Today's sales table, Stock report (with export to CSV)
+- Reports: Today's sales table, Stock report (with export to CSV),
+  period reports (week / month / custom range, profit, per brand) from daily rollups
+- Query profile window when started with SQL_PROFILE=1 (sql_profiler.py)
 - SQLite DB: mobileshop.db (created automatically)
 """
 
-import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 from datetime import datetime, date
-import csv
 import os
 
+import shop_export
+import sql_profiler
+from shop_db import Database
+from shop_migrations import MigrationError, migrate
+from shop_reports import GROUPINGS, PERIODS, Reports, period_range
+from shop_search import ProductSearch, label
+from tk_search import ProductPicker
+from tk_table import DataTable
+from tk_tasks import TaskRunner, report
+
 DB_FILE = "mobileshop.db"
 
 # ------------------------
 # Database functions
 # ------------------------
-def get_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# one long-lived connection per thread (WAL, tuned pragmas), see shop_db.py
+db = Database(DB_FILE)
+product_search = ProductSearch(db)
+reports = Reports(db)
 
 def init_db():
-    conn = get_connection()
-    cur = conn.cursor()
-    # products table
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        brand TEXT,
-        model TEXT,
-        imei TEXT,
-        purchase_price REAL,
-        selling_price REAL,
-        stock_qty INTEGER DEFAULT 0
-    )
-    """)
-    # purchases (inward)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS purchases (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id INTEGER,
-        qty INTEGER,
-        date TEXT,
-        vendor TEXT,
-        FOREIGN KEY(product_id) REFERENCES products(id)
-    )
-    """)
-    # sales (outward)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS sales (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id INTEGER,
-        qty INTEGER,
-        date TEXT,
-        customer TEXT,
-        payment_mode TEXT,
-        total_amount REAL,
-        FOREIGN KEY(product_id) REFERENCES products(id)
-    )
-    """)
-    conn.commit()
-    conn.close()
+    # creates the tables on first run and upgrades older files in place
+    migrate(db)
 
 # ------------------------
 # Data CRUD helpers
 # ------------------------
 def add_product(brand, model, imei, purchase_price, selling_price, stock_qty):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (brand, model, imei, purchase_price, selling_price, stock_qty))
-    conn.commit()
-    conn.close()
+    imei = (imei or "").strip() or None  # blank IMEIs are NULL (unique index)
+    with db.transaction() as conn:
+        conn.execute("""
+            INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (brand, model, imei, purchase_price, selling_price, stock_qty))
 
 def update_product(pid, brand, model, imei, purchase_price, selling_price, stock_qty):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE products SET brand=?, model=?, imei=?, purchase_price=?, selling_price=?, stock_qty=?
-        WHERE id=?
-    """, (brand, model, imei, purchase_price, selling_price, stock_qty, pid))
-    conn.commit()
-    conn.close()
+    imei = (imei or "").strip() or None
+    with db.transaction() as conn:
+        conn.execute("""
+            UPDATE products SET brand=?, model=?, imei=?, purchase_price=?, selling_price=?, stock_qty=?
+            WHERE id=?
+        """, (brand, model, imei, purchase_price, selling_price, stock_qty, pid))
 
 def delete_product(pid):
-    conn = get_connection()
-    cur = conn.cursor()
     # optionally prevent deletion if sales/purchases exist; for starter allow cascade but keep referential integrity
-    cur.execute("DELETE FROM products WHERE id=?", (pid,))
-    conn.commit()
-    conn.close()
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM products WHERE id=?", (pid,))
 
 def list_products():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM products ORDER BY brand, model")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return db.query("SELECT * FROM products ORDER BY brand, model")
 
 def get_product(pid):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM products WHERE id=?", (pid,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return db.query_one("SELECT * FROM products WHERE id=?", (pid,))
 
 def record_purchase(product_id, qty, vendor, entry_date=None):
     if entry_date is None:
         entry_date = datetime.now().strftime("%Y-%m-%d")
-    conn = get_connection()
-    cur = conn.cursor()
-    # insert into purchases
-    cur.execute("INSERT INTO purchases (product_id, qty, date, vendor) VALUES (?, ?, ?, ?)",
-                (product_id, qty, entry_date, vendor))
-    # update product stock
-    cur.execute("UPDATE products SET stock_qty = stock_qty + ? WHERE id=?", (qty, product_id))
-    conn.commit()
-    conn.close()
-
-def record_sale(product_id, qty, customer, payment_mode, entry_date=None):
+    with db.transaction() as conn:
+        # insert into purchases
+        conn.execute("INSERT INTO purchases (product_id, qty, date, vendor) VALUES (?, ?, ?, ?)",
+                     (product_id, qty, entry_date, vendor))
+        # update product stock
+        conn.execute("UPDATE products SET stock_qty = stock_qty + ? WHERE id=?", (qty, product_id))
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, available):
+        super().__init__(f"Product {product_id}: only {available} in stock")
+        self.product_id = product_id
+        self.available = available
+
+def record_basket(items, customer, payment_mode, entry_date=None):
+    """Sell several (product_id, qty) lines as one bill in a single transaction.
+
+    Stock is checked and decremented by one conditional UPDATE per line
+    under BEGIN IMMEDIATE, so two tills can't oversell the same unit, and
+    the whole bill costs one commit. Returns (True, bill_total), or
+    (False, (product_id, available_stock)) with nothing recorded.
+    """
     if entry_date is None:
         entry_date = datetime.now().strftime("%Y-%m-%d")
-    # get selling price
-    prod = get_product(product_id)
-    if not prod:
-        raise ValueError("Product not found")
-    selling_price = prod["selling_price"] or 0.0
-    total_amount = selling_price * qty
-
-    conn = get_connection()
-    cur = conn.cursor()
-    # check stock
-    cur.execute("SELECT stock_qty FROM products WHERE id=?", (product_id,))
-    stock = cur.fetchone()["stock_qty"]
-    if stock < qty:
-        conn.close()
-        return False, stock  # insufficient
-    # insert sale
-    cur.execute("""INSERT INTO sales (product_id, qty, date, customer, payment_mode, total_amount)
-                   VALUES (?, ?, ?, ?, ?, ?)""", (product_id, qty, entry_date, customer, payment_mode, total_amount))
-    # update product stock
-    cur.execute("UPDATE products SET stock_qty = stock_qty - ? WHERE id=?", (qty, product_id))
-    conn.commit()
-    conn.close()
-    return True, total_amount
+    # merge repeated products so the stock check covers the combined qty
+    lines = {}
+    for product_id, qty in items:
+        lines[product_id] = lines.get(product_id, 0) + qty
+    if not lines:
+        raise ValueError("Empty bill")
+
+    try:
+        with db.transaction(immediate=True) as conn:
+            marks = ",".join("?" * len(lines))
+            prices = {r["id"]: (r["selling_price"] or 0.0, r["purchase_price"] or 0.0) for r in
+                      conn.execute(f"SELECT id, selling_price, purchase_price FROM products WHERE id IN ({marks})", list(lines))}
+            missing = [pid for pid in lines if pid not in prices]
+            if missing:
+                raise ValueError(f"Product not found: {missing[0]}")
+
+            sales = []
+            for product_id, qty in lines.items():
+                cur = conn.execute("UPDATE products SET stock_qty = stock_qty - ? WHERE id=? AND stock_qty >= ?",
+                                   (qty, product_id, qty))
+                if cur.rowcount != 1:
+                    available = conn.execute("SELECT stock_qty FROM products WHERE id=?", (product_id,)).fetchone()[0]
+                    raise InsufficientStock(product_id, available)  # rolls the whole bill back
+                price, cost = prices[product_id]
+                sales.append((product_id, qty, entry_date, customer, payment_mode, price * qty, cost))
+            # unit_cost freezes the purchase price for profit reports (shop_reports.py)
+            conn.executemany("""INSERT INTO sales (product_id, qty, date, customer, payment_mode, total_amount, unit_cost)
+                                VALUES (?, ?, ?, ?, ?, ?, ?)""", sales)
+    except InsufficientStock as e:
+        return False, (e.product_id, e.available)
+    return True, sum(s[5] for s in sales)
+
+def record_sale(product_id, qty, customer, payment_mode, entry_date=None):
+    ok, info = record_basket([(product_id, qty)], customer, payment_mode, entry_date)
+    if not ok:
+        return False, info[1]  # insufficient
+    return True, info
 
 def todays_sales():
     today = date.today().strftime("%Y-%m-%d")
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
+    return db.query("""
         SELECT s.id, s.product_id, p.brand, p.model, s.qty, s.total_amount, s.customer, s.payment_mode, s.date
         FROM sales s JOIN products p ON s.product_id = p.id
         WHERE s.date = ?
         ORDER BY s.id DESC
     """, (today,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
 def stock_report():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, brand, model, imei, purchase_price, selling_price, stock_qty FROM products ORDER BY brand, model")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return db.query("SELECT id, brand, model, imei, purchase_price, selling_price, stock_qty FROM products ORDER BY brand, model")
 
+# dashboard figures come from trigger-maintained summary tables (migration 3),
+# so these are primary-key lookups rather than scans over products/sales
 def total_stock_value():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(purchase_price * stock_qty) as value FROM products")
-    val = cur.fetchone()["value"]
-    conn.close()
-    return val or 0.0
+    return db.scalar("SELECT stock_value FROM shop_totals WHERE id = 1", default=0.0)
+
+def product_count():
+    return db.scalar("SELECT product_count FROM shop_totals WHERE id = 1", default=0)
 
 def todays_sales_total_amount():
-    rows = todays_sales()
-    total = sum(row["total_amount"] for row in rows)
-    return total
+    today = date.today().strftime("%Y-%m-%d")
+    return db.scalar("SELECT amount FROM daily_sales WHERE date = ?", (today,), default=0.0)
+
+def todays_sales_count():
+    today = date.today().strftime("%Y-%m-%d")
+    return db.scalar("SELECT lines FROM daily_sales WHERE date = ?", (today,), default=0)
 
 # ------------------------
 # GUI
@@ -207,9 +181,37 @@ class MobileShopApp(tk.Tk):
         except:
             pass
 
+        # DB reads/writes and exports run on worker threads; results come back via after()
+        self.tasks = TaskRunner(self, on_busy=self.show_busy)
+        self._dash_task = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.create_widgets()
         self.refresh_dashboard()
 
+    def on_close(self):
+        self.tasks.shutdown()
+        self.destroy()
+
+    def run(self, fn, *args, on_done=None, on_error=None, owner=None, error_title="Error", **kwargs):
+        """Run fn in the background; errors are shown in a message box, then passed to on_error."""
+        def failed(e):
+            messagebox.showerror(error_title, str(e))
+            if on_error:
+                on_error(e)
+
+        return self.tasks.submit(fn, *args, on_done=on_done, on_error=failed, owner=owner, **kwargs)
+
+    def show_busy(self, count):
+        if count:
+            self.busy_var.set(f"Working... ({count})")
+            self.busy_bar.start(15)
+            self.cancel_btn.state(["!disabled"])
+        else:
+            self.busy_var.set("")
+            self.busy_bar.stop()
+            self.cancel_btn.state(["disabled"])
+
     def create_widgets(self):
         # Top Frame - Dashboard
         top = ttk.Frame(self, padding=10)
@@ -247,31 +249,41 @@ class MobileShopApp(tk.Tk):
 
         ttk.Label(mid, text="Today's Sales (Quick view)", font=("Arial", 12, "underline")).pack(anchor=tk.W)
 
-        self.sales_tree = ttk.Treeview(mid, columns=("id","brand","model","qty","amount","customer","pmode"), show="headings", height=8)
-        for c,h in [("id","ID"),("brand","Brand"),("model","Model"),("qty","Qty"),("amount","Amount"),("customer","Customer"),("pmode","Payment")]:
-            self.sales_tree.heading(c, text=h)
-            self.sales_tree.column(c, width=100, anchor=tk.CENTER)
+        self.sales_tree = DataTable(mid, [(c, h, 100) for c, h in [("id","ID"),("brand","Brand"),("model","Model"),("qty","Qty"),("amount","Amount"),("customer","Customer"),("pmode","Payment")]], height=8)
         self.sales_tree.pack(fill=tk.BOTH, expand=True, pady=8)
 
         # Bottom - Status
         bottom = ttk.Frame(self, padding=10)
         bottom.pack(side=tk.BOTTOM, fill=tk.X)
         ttk.Button(bottom, text="Refresh Dashboard", command=self.refresh_dashboard).pack(side=tk.LEFT)
+        # busy indicator for background work
+        self.busy_bar = ttk.Progressbar(bottom, mode="indeterminate", length=120)
+        self.busy_bar.pack(side=tk.LEFT, padx=(20,5))
+        self.busy_var = tk.StringVar(value="")
+        ttk.Label(bottom, textvariable=self.busy_var).pack(side=tk.LEFT)
+        self.cancel_btn = ttk.Button(bottom, text="Cancel", command=lambda: self.tasks.cancel_all(), state="disabled")
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         ttk.Button(bottom, text="Export Today's Sales CSV", command=self.export_todays_sales_csv).pack(side=tk.RIGHT)
+        if sql_profiler.ENABLED:
+            ttk.Button(bottom, text="Query Profile", command=self.open_profile_win).pack(side=tk.RIGHT, padx=5)
 
     def refresh_dashboard(self):
-        total = todays_sales_total_amount()
-        self.today_sales_var.set(f"₹{total:.2f}")
-        stock_val = total_stock_value()
-        self.stock_value_var.set(f"₹{stock_val:.2f}")
-        prods = list_products()
-        self.total_products_var.set(str(len(prods)))
-
-        # refresh today's sales tree
-        for i in self.sales_tree.get_children():
-            self.sales_tree.delete(i)
-        for row in todays_sales():
-            self.sales_tree.insert("", tk.END, values=(row["id"], row["brand"], row["model"], row["qty"], f"₹{row['total_amount']:.2f}", row["customer"], row["payment_mode"]))
+        def load():
+            rows = [(row["id"], row["brand"], row["model"], row["qty"], f"₹{row['total_amount']:.2f}", row["customer"], row["payment_mode"]) for row in todays_sales()]
+            return todays_sales_total_amount(), total_stock_value(), product_count(), rows
+
+        def show(result):
+            total, stock_val, count, rows = result
+            self.today_sales_var.set(f"₹{total:.2f}")
+            self.stock_value_var.set(f"₹{stock_val:.2f}")
+            self.total_products_var.set(str(count))
+            # refresh today's sales tree (only new/changed rows touch the widget)
+            self.sales_tree.set_rows(rows)
+
+        # a newer refresh supersedes one still queued
+        if self._dash_task and not self._dash_task.done:
+            self._dash_task.cancel()
+        self._dash_task = self.run(load, on_done=show, label="refresh_dashboard")
 
     # ====== Product window ======
     def open_products_win(self):
@@ -283,21 +295,23 @@ class MobileShopApp(tk.Tk):
         frame.pack(fill=tk.BOTH, expand=True)
 
         cols = ("id","brand","model","imei","purchase","selling","stock")
-        tree = ttk.Treeview(frame, columns=cols, show="headings")
         headings = {"id":"ID","brand":"Brand","model":"Model","imei":"IMEI","purchase":"Purchase Price","selling":"Selling Price","stock":"Stock"}
-        for c in cols:
-            tree.heading(c, text=headings[c])
-            tree.column(c, anchor=tk.CENTER, width=110)
+        tree = DataTable(frame, [(c, headings[c], 110) for c in cols])
         tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
 
         # populate
+        def load_rows():
+            return [(p["id"], p["brand"], p["model"], p["imei"] or "", f"{p['purchase_price']:.2f}", f"{p['selling_price']:.2f}", p["stock_qty"]) for p in list_products()]
+
         def refresh_tree():
-            for i in tree.get_children():
-                tree.delete(i)
-            for p in list_products():
-                tree.insert("", tk.END, values=(p["id"], p["brand"], p["model"], p["imei"], f"{p['purchase_price']:.2f}", f"{p['selling_price']:.2f}", p["stock_qty"]))
+            self.run(load_rows, on_done=tree.set_rows, owner=win, label="products.refresh")
         refresh_tree()
 
+        def saved(_):
+            if win.winfo_exists():  # writes report back even if the window was closed meanwhile
+                refresh_tree()
+            self.refresh_dashboard()
+
         # right control panel
         ctrl = ttk.Frame(frame, padding=10)
         ctrl.pack(side=tk.RIGHT, fill=tk.Y)
@@ -306,63 +320,47 @@ class MobileShopApp(tk.Tk):
             dialog = ProductDialog(self, title="Add Product")
             if dialog.result:
                 b,m,imei,pp,sp,st = dialog.result
-                try:
-                    add_product(b,m,imei,float(pp),float(sp),int(st))
-                    refresh_tree()
-                    self.refresh_dashboard()
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to add product: {e}")
+                self.run(add_product, b,m,imei,float(pp),float(sp),int(st), on_done=saved, owner=win, error_title="Failed to add product", cancellable=False)
 
         def on_edit():
-            selected = tree.focus()
-            if not selected:
+            pid = tree.selected_key()
+            if pid is None:
                 messagebox.showinfo("Select", "Select a product to edit")
                 return
-            vals = tree.item(selected, "values")
-            pid = int(vals[0])
             p = get_product(pid)
             dialog = ProductDialog(self, title="Edit Product", product=p)
             if dialog.result:
                 b,m,imei,pp,sp,st = dialog.result
-                try:
-                    update_product(pid,b,m,imei,float(pp),float(sp),int(st))
-                    refresh_tree()
-                    self.refresh_dashboard()
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to update product: {e}")
+                self.run(update_product, pid,b,m,imei,float(pp),float(sp),int(st), on_done=saved, owner=win, error_title="Failed to update product", cancellable=False)
 
         def on_delete():
-            selected = tree.focus()
-            if not selected:
+            pid = tree.selected_key()
+            if pid is None:
                 messagebox.showinfo("Select", "Select a product to delete")
                 return
-            vals = tree.item(selected, "values")
-            pid = int(vals[0])
             if messagebox.askyesno("Confirm", f"Delete product ID {pid}?"):
-                delete_product(pid)
-                refresh_tree()
-                self.refresh_dashboard()
+                self.run(delete_product, pid, on_done=saved, owner=win, cancellable=False)
 
         ttk.Button(ctrl, text="Add Product", command=on_add).pack(fill=tk.X, pady=5)
         ttk.Button(ctrl, text="Edit Selected", command=on_edit).pack(fill=tk.X, pady=5)
         ttk.Button(ctrl, text="Delete Selected", command=on_delete).pack(fill=tk.X, pady=5)
         ttk.Button(ctrl, text="Refresh", command=refresh_tree).pack(fill=tk.X, pady=5)
         ttk.Button(ctrl, text="Export Stock CSV", command=self.export_stock_csv).pack(fill=tk.X, pady=5)
+        ttk.Button(ctrl, text="Import Products...", command=lambda: self.bulk_import("products", refresh_tree)).pack(fill=tk.X, pady=5)
 
     # ====== Inward (Purchase) window ======
     def open_inward_win(self):
         win = tk.Toplevel(self)
         win.title("Inward (Purchase Entry)")
-        win.geometry("500x350")
+        win.geometry("560x460")
         frame = ttk.Frame(win, padding=10)
         frame.pack(fill=tk.BOTH, expand=True)
 
-        ttk.Label(frame, text="Product:").grid(row=0, column=0, sticky=tk.W, pady=5)
-        prods = list_products()
-        prod_map = { f"{p['id']} - {p['brand']} {p['model']} (Stock: {p['stock_qty']})": p['id'] for p in prods }
-        prod_names = list(prod_map.keys())
-        prod_cb = ttk.Combobox(frame, values=prod_names, state="readonly")
-        prod_cb.grid(row=0, column=1, sticky=tk.W, pady=5)
+        ttk.Label(frame, text="Product:").grid(row=0, column=0, sticky=tk.NW, pady=5)
+        # type brand/model to search, or scan an IMEI
+        picker = ProductPicker(frame, product_search, on_scan=lambda row: qty_ent.focus_set())
+        picker.grid(row=0, column=1, sticky=tk.W, pady=5)
+        picker.entry.focus_set()
 
         ttk.Label(frame, text="Qty:").grid(row=1, column=0, sticky=tk.W, pady=5)
         qty_ent = ttk.Entry(frame)
@@ -373,11 +371,11 @@ class MobileShopApp(tk.Tk):
         vendor_ent.grid(row=2, column=1, sticky=tk.W, pady=5)
 
         def save_purchase():
-            sel = prod_cb.get()
-            if not sel:
+            product = picker.get()
+            if not product:
                 messagebox.showinfo("Select", "Select a product")
                 return
-            pid = prod_map[sel]
+            pid = product["id"]
             try:
                 q = int(qty_ent.get())
                 if q <= 0:
@@ -386,30 +384,40 @@ class MobileShopApp(tk.Tk):
                 messagebox.showerror("Invalid", "Enter valid qty")
                 return
             v = vendor_ent.get().strip()
-            try:
-                record_purchase(pid, q, v or "Unknown")
+
+            # the write runs in the background; one click, one purchase
+            save_btn.state(["disabled"])
+
+            def finish(_):
                 messagebox.showinfo("Saved", f"Purchase recorded. {q} units added.")
-                win.destroy()
+                if win.winfo_exists():  # writes report back even if the window was closed meanwhile
+                    win.destroy()
                 self.refresh_dashboard()
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
 
-        ttk.Button(frame, text="Save Purchase", command=save_purchase).grid(row=4, column=0, columnspan=2, pady=10)
+            def failed(_):
+                if win.winfo_exists():
+                    save_btn.state(["!disabled"])
+
+            self.run(record_purchase, pid, q, v or "Unknown", on_done=finish, on_error=failed, owner=win,
+                     label="inward.save", cancellable=False)
+
+        save_btn = ttk.Button(frame, text="Save Purchase", command=save_purchase)
+        save_btn.grid(row=4, column=0, columnspan=2, pady=10)
+        ttk.Button(frame, text="Import Invoice...", command=lambda: self.bulk_import("purchases", win.destroy)).grid(row=5, column=0, columnspan=2)
 
     # ====== Sales (Outward) window ======
     def open_sales_win(self):
         win = tk.Toplevel(self)
         win.title("Outward (Sales Entry)")
-        win.geometry("550x380")
+        win.geometry("650x600")
         frame = ttk.Frame(win, padding=10)
         frame.pack(fill=tk.BOTH, expand=True)
 
-        ttk.Label(frame, text="Product:").grid(row=0, column=0, sticky=tk.W, pady=5)
-        prods = list_products()
-        prod_map = { f"{p['id']} - {p['brand']} {p['model']} (Stock: {p['stock_qty']})": p['id'] for p in prods }
-        prod_names = list(prod_map.keys())
-        prod_cb = ttk.Combobox(frame, values=prod_names, state="readonly")
-        prod_cb.grid(row=0, column=1, sticky=tk.W, pady=5)
+        ttk.Label(frame, text="Product:").grid(row=0, column=0, sticky=tk.NW, pady=5)
+        # type brand/model to search; a scanned IMEI goes straight onto the bill
+        picker = ProductPicker(frame, product_search, on_pick=lambda row: qty_ent.focus_set(), on_scan=lambda row: scan_to_bill())
+        picker.grid(row=0, column=1, sticky=tk.W, pady=5)
+        picker.entry.focus_set()
 
         ttk.Label(frame, text="Qty:").grid(row=1, column=0, sticky=tk.W, pady=5)
         qty_ent = ttk.Entry(frame)
@@ -424,31 +432,78 @@ class MobileShopApp(tk.Tk):
         pmode_cb.grid(row=3, column=1, sticky=tk.W, pady=5)
         pmode_cb.set("Cash")
 
-        def save_sale():
-            sel = prod_cb.get()
-            if not sel:
+        # bill lines: several products can be rung up and saved in one commit
+        bill = []  # (pid, label, qty)
+        bill_tree = ttk.Treeview(frame, columns=("product","qty"), show="headings", height=5)
+        bill_tree.heading("product", text="Product"); bill_tree.column("product", width=300)
+        bill_tree.heading("qty", text="Qty"); bill_tree.column("qty", width=60, anchor=tk.CENTER)
+        bill_tree.grid(row=4, column=0, columnspan=3, sticky=tk.EW, pady=5)
+
+        def read_line():
+            product = picker.get()
+            if not product:
                 messagebox.showinfo("Select", "Select a product")
-                return
-            pid = prod_map[sel]
+                return None
             try:
                 q = int(qty_ent.get())
                 if q <= 0:
                     raise ValueError()
             except:
                 messagebox.showerror("Invalid", "Enter valid qty")
-                return
+                return None
+            return product["id"], label(product), q
+
+        def add_to_bill():
+            line = read_line()
+            if line:
+                bill.append(line)
+                bill_tree.insert("", tk.END, values=(line[1], line[2]))
+                qty_ent.delete(0, tk.END)
+                picker.clear()
+
+        def scan_to_bill():
+            # one scan = one unit
+            qty_ent.delete(0, tk.END)
+            qty_ent.insert(0, "1")
+            add_to_bill()
+
+        def save_sale():
+            lines = list(bill)
+            if not lines:
+                line = read_line()
+                if not line:
+                    return
+                lines = [line]
             cust = cust_ent.get().strip() or "Walk-in"
             pmode = pmode_cb.get() or "Cash"
-            ok, info = record_sale(pid, q, cust, pmode)
-            if not ok:
-                messagebox.showerror("Insufficient Stock", f"Available stock: {info}. Cannot sell {q}.")
-                return
-            else:
-                messagebox.showinfo("Sale Saved", f"Sale recorded. Total: ₹{info:.2f}")
-                win.destroy()
-                self.refresh_dashboard()
 
-        ttk.Button(frame, text="Save Sale", command=save_sale).grid(row=5, column=0, columnspan=2, pady=10)
+            # the write runs in the background; one click, one sale
+            save_btn.state(["disabled"])
+
+            def failed(_):
+                if win.winfo_exists():
+                    save_btn.state(["!disabled"])
+
+            def finish(result):
+                ok, info = result
+                if not ok:
+                    pid, available = info
+                    wanted = sum(q for p, _, q in lines if p == pid)
+                    messagebox.showerror("Insufficient Stock", f"Product {pid}: available stock {available}. Cannot sell {wanted}.")
+                    failed(None)
+                    return
+                else:
+                    messagebox.showinfo("Sale Saved", f"Sale recorded ({len(lines)} line(s)). Total: ₹{info:.2f}")
+                    if win.winfo_exists():  # writes report back even if the window was closed meanwhile
+                        win.destroy()
+                    self.refresh_dashboard()
+
+            self.run(record_basket, [(pid, q) for pid, _, q in lines], cust, pmode, on_done=finish, on_error=failed,
+                     owner=win, label="sales.save", cancellable=False)
+
+        ttk.Button(frame, text="Add to Bill", command=add_to_bill).grid(row=1, column=2, sticky=tk.W, padx=5)
+        save_btn = ttk.Button(frame, text="Save Sale", command=save_sale)
+        save_btn.grid(row=5, column=0, columnspan=2, pady=10)
 
     # ====== Reports window ======
     def open_reports_win(self):
@@ -466,20 +521,21 @@ class MobileShopApp(tk.Tk):
         tab1 = ttk.Frame(nb)
         nb.add(tab1, text="Today's Sales")
 
-        tree1 = ttk.Treeview(tab1, columns=("id","brand","model","qty","amount","customer","payment","date"), show="headings")
-        for c,h in [("id","ID"),("brand","Brand"),("model","Model"),("qty","Qty"),("amount","Amount"),("customer","Customer"),("payment","Payment"),("date","Date")]:
-            tree1.heading(c, text=h)
-            tree1.column(c, width=110, anchor=tk.CENTER)
+        tree1 = DataTable(tab1, [(c, h, 110) for c, h in [("id","ID"),("brand","Brand"),("model","Model"),("qty","Qty"),("amount","Amount"),("customer","Customer"),("payment","Payment"),("date","Date")]])
         tree1.pack(fill=tk.BOTH, expand=True, pady=5)
 
-        def refresh_sales():
-            for i in tree1.get_children():
-                tree1.delete(i)
-            for row in todays_sales():
-                tree1.insert("", tk.END, values=(row["id"],row["brand"],row["model"],row["qty"],f"₹{row['total_amount']:.2f}",row["customer"],row["payment_mode"],row["date"]))
-            total = todays_sales_total_amount()
+        def load_sales():
+            rows = [(row["id"],row["brand"],row["model"],row["qty"],f"₹{row['total_amount']:.2f}",row["customer"],row["payment_mode"],row["date"]) for row in todays_sales()]
+            return rows, todays_sales_total_amount()
+
+        def show_sales(result):
+            rows, total = result
+            tree1.set_rows(rows)
             lbl_total.config(text=f"Today's Total: ₹{total:.2f}")
 
+        def refresh_sales():
+            self.run(load_sales, on_done=show_sales, owner=win, label="reports.today_sales")
+
         lbl_total = ttk.Label(tab1, text="Today's Total: ₹0.00", font=("Arial", 12, "bold"))
         lbl_total.pack(anchor=tk.W, pady=4)
         ttk.Button(tab1, text="Refresh", command=refresh_sales).pack(anchor=tk.NE)
@@ -489,64 +545,197 @@ class MobileShopApp(tk.Tk):
         tab2 = ttk.Frame(nb)
         nb.add(tab2, text="Stock Report")
 
-        tree2 = ttk.Treeview(tab2, columns=("id","brand","model","imei","purchase","selling","stock","value"), show="headings")
-        for c,h,w in [("id","ID",50),("brand","Brand",120),("model","Model",120),("imei","IMEI",120),("purchase","Purchase",80),("selling","Selling",80),("stock","Stock",60),("value","Stock Value",100)]:
-            tree2.heading(c, text=h)
-            tree2.column(c, width=w, anchor=tk.CENTER)
+        tree2 = DataTable(tab2, [("id","ID",50),("brand","Brand",120),("model","Model",120),("imei","IMEI",120),("purchase","Purchase",80),("selling","Selling",80),("stock","Stock",60),("value","Stock Value",100)])
         tree2.pack(fill=tk.BOTH, expand=True, pady=5)
         lbl_stockval = ttk.Label(tab2, text="Total Stock Value: ₹0.00", font=("Arial", 12, "bold"))
         lbl_stockval.pack(anchor=tk.W, pady=4)
 
-        def refresh_stock():
-            for i in tree2.get_children():
-                tree2.delete(i)
+        def load_stock():
             total = 0.0
+            rows = []
             for row in stock_report():
                 val = (row["purchase_price"] or 0.0) * (row["stock_qty"] or 0)
                 total += val
-                tree2.insert("", tk.END, values=(row["id"],row["brand"],row["model"],row["imei"],f"₹{row['purchase_price']:.2f}",f"₹{row['selling_price']:.2f}",row["stock_qty"],f"₹{val:.2f}"))
+                rows.append((row["id"],row["brand"],row["model"],row["imei"] or "",f"₹{row['purchase_price']:.2f}",f"₹{row['selling_price']:.2f}",row["stock_qty"],f"₹{val:.2f}"))
+            return rows, total
+
+        def show_stock(result):
+            rows, total = result
+            tree2.set_rows(rows)
             lbl_stockval.config(text=f"Total Stock Value: ₹{total:.2f}")
 
+        def refresh_stock():
+            self.run(load_stock, on_done=show_stock, owner=win, label="reports.stock")
+
         ttk.Button(tab2, text="Refresh Stock Report", command=refresh_stock).pack(anchor=tk.NE)
         refresh_stock()
 
+        # Period Report Tab (reads the daily rollup, see shop_reports.py)
+        tab3 = ttk.Frame(nb)
+        nb.add(tab3, text="Period Report")
+
+        opts = ttk.Frame(tab3)
+        opts.pack(fill=tk.X, pady=5)
+        ttk.Label(opts, text="Period:").pack(side=tk.LEFT)
+        period_cb = ttk.Combobox(opts, values=PERIODS, state="readonly", width=12)
+        period_cb.set("This month")
+        period_cb.pack(side=tk.LEFT, padx=4)
+        ttk.Label(opts, text="From:").pack(side=tk.LEFT, padx=(10,0))
+        from_ent = ttk.Entry(opts, width=11)
+        from_ent.pack(side=tk.LEFT, padx=4)
+        ttk.Label(opts, text="To:").pack(side=tk.LEFT)
+        to_ent = ttk.Entry(opts, width=11)
+        to_ent.pack(side=tk.LEFT, padx=4)
+        ttk.Label(opts, text="Group by:").pack(side=tk.LEFT, padx=(10,0))
+        group_cb = ttk.Combobox(opts, values=GROUPINGS, state="readonly", width=9)
+        group_cb.set("Day")
+        group_cb.pack(side=tk.LEFT, padx=4)
+
+        tree3 = DataTable(tab3, [("label","Group",220,tk.W),("qty","Qty",70),("amount","Sales",110),("cost","Cost",110),("profit","Profit",110),("lines","Lines",70)])
+        tree3.pack(fill=tk.BOTH, expand=True, pady=5)
+        lbl_period = ttk.Label(tab3, text="", font=("Arial", 12, "bold"))
+        lbl_period.pack(anchor=tk.W, pady=4)
+
+        def show_period(result):
+            first, last, summary, rows = result
+            from_ent.delete(0, tk.END); from_ent.insert(0, first)
+            to_ent.delete(0, tk.END); to_ent.insert(0, last)
+            tree3.set_rows((lbl, qty, f"₹{amt:.2f}", f"₹{cost:.2f}", f"₹{profit:.2f}", n) for lbl, qty, amt, cost, profit, n in rows)
+            lbl_period.config(text=f"{first} to {last}:  Sales ₹{summary['amount']:.2f}   Profit ₹{summary['profit']:.2f}   Qty {summary['qty']}")
+
+        def refresh_period(*_):
+            try:
+                first, last = period_range(period_cb.get(), start=from_ent.get().strip(), end=to_ent.get().strip())
+            except ValueError as e:
+                messagebox.showerror("Invalid Range", f"{e}\nUse YYYY-MM-DD dates for a custom range.")
+                return
+            by = group_cb.get()
+            self.run(lambda: (first, last, reports.summary(first, last), reports.breakdown(first, last, by)),
+                     on_done=show_period, owner=win, label="reports.period")
+
+        period_cb.bind("<<ComboboxSelected>>", refresh_period)
+        group_cb.bind("<<ComboboxSelected>>", refresh_period)
+        ttk.Button(opts, text="Show", command=refresh_period).pack(side=tk.LEFT, padx=6)
+
+        def export_period():
+            try:
+                first, last = period_range(period_cb.get(), start=from_ent.get().strip(), end=to_ent.get().strip())
+            except ValueError as e:
+                messagebox.showerror("Invalid Range", str(e))
+                return
+            self.export_file("sales_detail", "Export Sales", f"sales_{first}_to_{last}.csv", first, last)
+
+        ttk.Button(opts, text="Export...", command=export_period).pack(side=tk.LEFT)
+        refresh_period()
+
         # Export Buttons
         bottom = ttk.Frame(win, padding=8)
         bottom.pack(fill=tk.X)
         ttk.Button(bottom, text="Export Today's Sales CSV", command=self.export_todays_sales_csv).pack(side=tk.LEFT)
         ttk.Button(bottom, text="Export Stock CSV", command=self.export_stock_csv).pack(side=tk.LEFT, padx=8)
 
-    # ===== CSV export helpers =====
-    def export_todays_sales_csv(self):
-        rows = todays_sales()
-        if not rows:
-            messagebox.showinfo("No Data", "No sales for today.")
+    # ===== Query profile (admin, SQL_PROFILE=1) =====
+    def open_profile_win(self):
+        win = tk.Toplevel(self)
+        win.title("Query Profile")
+        win.geometry("1000x600")
+        frame = ttk.Frame(win, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        stats = [("count","Count",70),("total","Total ms",90),("mean","Mean ms",80),("p95","p95 ms",80),("max","Max ms",80)]
+        ttk.Label(frame, text="UI paths", font=("Arial", 12, "underline")).pack(anchor=tk.W)
+        paths = DataTable(frame, [("path","Path",300,tk.W)] + stats, height=6)
+        paths.pack(fill=tk.X, pady=5)
+        ttk.Label(frame, text="Statements (slowest total first)", font=("Arial", 12, "underline")).pack(anchor=tk.W)
+        queries = DataTable(frame, [("template","Statement",480,tk.W)] + stats + [("rows","Rows",80)])
+        queries.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        def timings(r):
+            return (r["count"], f"{r['total_ms']:.1f}", f"{r['mean_ms']:.2f}", f"{r['p95_ms']:.2f}", f"{r['max_ms']:.2f}")
+
+        def refresh():
+            paths.set_rows((r["path"],) + timings(r) for r in sql_profiler.path_report())
+            queries.set_rows((r["template"],) + timings(r) + (r["rows"],) for r in sql_profiler.query_report())
+
+        def reset():
+            sql_profiler.reset()
+            refresh()
+
+        def save():
+            fpath = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text","*.txt")], title="Save Query Profile",
+                                                 initialfile=f"query_profile_{date.today().isoformat()}.txt")
+            if fpath:
+                sql_profiler.dump(fpath)
+
+        bottom = ttk.Frame(win, padding=8)
+        bottom.pack(fill=tk.X)
+        ttk.Button(bottom, text="Refresh", command=refresh).pack(side=tk.LEFT)
+        ttk.Button(bottom, text="Reset", command=reset).pack(side=tk.LEFT, padx=8)
+        ttk.Button(bottom, text="Save Report...", command=save).pack(side=tk.LEFT)
+        refresh()
+
+    # ===== Bulk import (CSV / Excel invoices) =====
+    def bulk_import(self, kind, on_done=None):
+        import shop_import  # pandas is only loaded when an import is actually run
+
+        fpath = filedialog.askopenfilename(title=f"Import {kind.title()}", filetypes=[("CSV or Excel","*.csv *.xlsx"),("All files","*.*")])
+        if not fpath:
             return
-        fpath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files","*.csv")], title="Save Today's Sales CSV", initialfile=f"todays_sales_{date.today().isoformat()}.csv")
+        vendor = simpledialog.askstring("Vendor", "Vendor for this invoice (blank for opening stock):", parent=self) if kind == "products" else None
+
+        def work():
+            if kind == "products":
+                result = shop_import.import_products(db, fpath, vendor=(vendor or "").strip() or None)
+            else:
+                result = shop_import.import_purchases(db, fpath, vendor="Unknown")
+            msg = result.summary()
+            if len(result.rejected):
+                report = shop_import.rejected_report_path(fpath)
+                result.write_rejected(report)
+                msg += f"\nRejected rows written to {os.path.basename(report)}"
+            return msg
+
+        def finish(msg):
+            messagebox.showinfo("Import", msg)
+            self.refresh_dashboard()
+            if on_done:
+                on_done()
+
+        self.run(work, on_done=finish, error_title="Import Failed", label=f"import.{kind}", cancellable=False)
+
+    # ===== Export helpers =====
+    # the empty checks are summary-table lookups; shop_export streams the rows on a worker
+    EXPORT_TYPES = [("CSV files","*.csv"),("Gzipped CSV","*.csv.gz"),("Excel workbook","*.xlsx")]
+
+    def export_file(self, kind, title, initialfile, first=None, last=None):
+        fpath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=self.EXPORT_TYPES, title=title, initialfile=initialfile)
         if not fpath:
             return
-        with open(fpath, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["ID","Brand","Model","Qty","TotalAmount","Customer","PaymentMode","Date"])
-            for r in rows:
-                w.writerow([r["id"], r["brand"], r["model"], r["qty"], f"{r['total_amount']:.2f}", r["customer"], r["payment_mode"], r["date"]])
-        messagebox.showinfo("Saved", f"Today's sales exported to {os.path.basename(fpath)}")
+        try:
+            shop_export.format_for(fpath)
+        except ValueError as e:
+            messagebox.showerror("Export", str(e))
+            return
+
+        def progress(done, total):
+            self.busy_var.set(f"Exporting {done:,} / {total:,} rows")
+
+        self.run(shop_export.export, db, kind, fpath, first, last, progress=report,
+                 on_progress=progress, error_title="Export Failed", label=f"export.{kind}",
+                 on_done=lambda n: messagebox.showinfo("Saved", f"{n:,} rows exported to {os.path.basename(fpath)}"))
+
+    def export_todays_sales_csv(self):
+        if not todays_sales_count():
+            messagebox.showinfo("No Data", "No sales for today.")
+            return
+        today = date.today().isoformat()
+        self.export_file("sales", "Save Today's Sales", f"todays_sales_{today}.csv", today, today)
 
     def export_stock_csv(self):
-        rows = stock_report()
-        if not rows:
+        if not product_count():
             messagebox.showinfo("No Data", "No products available.")
             return
-        fpath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files","*.csv")], title="Save Stock CSV", initialfile=f"stock_report_{date.today().isoformat()}.csv")
-        if not fpath:
-            return
-        with open(fpath, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["ID","Brand","Model","IMEI","PurchasePrice","SellingPrice","StockQty","StockValue"])
-            for r in rows:
-                val = (r["purchase_price"] or 0.0) * (r["stock_qty"] or 0)
-                w.writerow([r["id"], r["brand"], r["model"], r["imei"], f"{r['purchase_price']:.2f}", f"{r['selling_price']:.2f}", r["stock_qty"], f"{val:.2f}"])
-        messagebox.showinfo("Saved", f"Stock exported to {os.path.basename(fpath)}")
+        self.export_file("stock", "Save Stock Report", f"stock_report_{date.today().isoformat()}.csv")
 
 # Product add/edit dialog
 class ProductDialog(simpledialog.Dialog):
@@ -601,6 +790,11 @@ class ProductDialog(simpledialog.Dialog):
 # Main
 # ------------------------
 if __name__ == "__main__":
-    init_db()
+    try:
+        init_db()
+    except MigrationError as e:
+        messagebox.showerror("Database Upgrade Failed", str(e))
+        raise SystemExit(1)
     app = MobileShopApp()
     app.mainloop()
+    db.close()
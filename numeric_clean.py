@@ -0,0 +1,119 @@
+"""
+numeric_clean.py
+Parses the messy numbers found in screener exports, a whole column at once.
+
+pd.to_numeric(errors="coerce") turns "1,234.50", "+2.3%", "(1.2)" or
+"₹ 540" into NaN without a word, so a stock with a formatted price simply
+dropped out of the diffs. parse_numeric() converts the numeric cells in one
+numpy pass (real numbers never touch a string op), then runs only the
+leftover text cells through a few vectorised Arrow compute kernels:
+strip currency, percent signs, thousands separators and blanks, read
+accounting parentheses as a minus sign, and map placeholders such as "—"
+or "N/A" to a missing value. Anything still unreadable is NaN and flagged
+in a bad-cell mask instead of vanishing.
+
+read_stock_sheet() runs this once per file, before any join, and records
+the bad cells in frame.attrs (which survives the Arrow and Parquet round
+trips of the ingest pool and upload cache); bad_cells()/bad_summary() read
+them back for the UI.
+"""
+
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# cells that mean "no value" rather than "unreadable value"
+NULL_TOKENS = ["", "-", "—", "–", "--", "N/A", "NA", "NAN", "NONE", "NULL", "NIL"]
+# everything that can sit around a number: currency, percent, separators, spaces.
+# RE2 patterns for the Arrow string kernels
+JUNK = r"[\s,₹$€£%]|[Rr][Ss]\.?|INR|inr"
+MINUS = r"[−–]"  # unicode minus / en dash used as a sign
+NUMBER = r"^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$"
+_NULLS = pa.array(NULL_TOKENS)
+_NUMERIC_TYPES = {float, int, bool}
+ATTR = "bad_cells"
+EXAMPLES = 5
+
+
+def _split(values):
+    """float64 array of the plain numeric cells (NaN elsewhere) and the positions
+    of everything else (text, blanks, dates...)."""
+    try:
+        # all numbers / blanks (or plain numeric text): a single C-level pass
+        return np.array(values, dtype=np.float64), np.empty(0, dtype=np.intp)
+    except (TypeError, ValueError):
+        pass
+    nan = np.nan
+    out = np.fromiter((v if type(v) in _NUMERIC_TYPES else nan for v in values), dtype=np.float64, count=len(values))
+    return out, np.flatnonzero(np.isnan(out))
+
+
+def parse_numeric(values):
+    """(float64 array, bad-cell mask) for a column of numbers, numeric text or junk.
+
+    Blank cells and NULL_TOKENS come back as NaN with bad=False; cells that
+    hold text which isn't a number come back as NaN with bad=True.
+    """
+    if isinstance(values, pd.Series):
+        values = values.to_numpy(dtype=object)
+    out, todo = _split(values)
+    bad = np.zeros(len(out), dtype=bool)
+    if len(todo) == 0:
+        return out, bad
+
+    cells = [values[i] for i in todo]
+    text = [v if v is None or type(v) is str else str(v) for v in cells]  # a date is just bad text here
+    text = pc.utf8_trim_whitespace(pa.array(text, type=pa.string()))
+    null = pc.or_kleene(pc.is_null(text), pc.is_in(pc.utf8_upper(text), value_set=_NULLS)).fill_null(True)
+    negative = pc.and_(pc.starts_with(text, "("), pc.ends_with(text, ")")).fill_null(False)
+    body = pc.replace_substring_regex(pc.replace_substring_regex(text, MINUS, "-"), JUNK, "")
+    body = pc.utf8_trim(body, "()")
+    # validate, then cast in Arrow (to_numeric on strings goes through Python objects)
+    num = pc.cast(pc.if_else(pc.match_substring_regex(body, NUMBER), body, None), pa.float64())
+    num = pc.if_else(negative, pc.negate(num), num).to_numpy(zero_copy_only=False)
+
+    out[todo] = num
+    bad[todo] = np.isnan(num) & ~null.to_numpy(zero_copy_only=False)
+    return out, bad
+
+
+def record_bad(frame: pd.DataFrame, column, bad, raw):
+    """Remember the bad cells of `column` in frame.attrs (positions + a few examples)."""
+    rows = np.flatnonzero(bad)
+    if len(rows):
+        raw = pd.Series(raw, dtype=object)
+        frame.attrs.setdefault(ATTR, {})[column] = {
+            "rows": rows.tolist(),
+            "examples": [str(v) for v in raw.iloc[rows[:EXAMPLES]]],
+        }
+
+
+def bad_cells(frame: pd.DataFrame) -> dict:
+    """{column: row positions} of cells that failed to parse when the frame was read."""
+    return {col: np.asarray(info["rows"], dtype=np.int64) for col, info in frame.attrs.get(ATTR, {}).items()}
+
+
+def bad_summary(frame: pd.DataFrame) -> pd.DataFrame:
+    """One row per column with unreadable cells: count and a few of the raw values."""
+    info = frame.attrs.get(ATTR, {})
+    return pd.DataFrame({
+        "column": list(info),
+        "bad_cells": [len(v["rows"]) for v in info.values()],
+        "examples": [", ".join(repr(x) for x in v["examples"]) for v in info.values()],
+    })
+
+
+def concat(frames) -> pd.DataFrame:
+    """pd.concat(ignore_index=True) that carries the bad-cell records along."""
+    out = pd.concat(frames, ignore_index=True)
+    merged, offset = {}, 0
+    for frame in frames:
+        for col, info in frame.attrs.get(ATTR, {}).items():
+            entry = merged.setdefault(col, {"rows": [], "examples": []})
+            entry["rows"].extend(r + offset for r in info["rows"])
+            entry["examples"] = (entry["examples"] + info["examples"])[:EXAMPLES]
+        offset += len(frame)
+    out.attrs = {ATTR: merged} if merged else {}
+    return out
@@ -0,0 +1,76 @@
+"""
+result_view.py
+Server-side filtering, ranking and pagination over a comparison result.
+
+The full (already chg_diff-sorted) result stays on the server; the UI only
+receives the rows of the current page. Symbol prefix search uses a sorted
+symbol index (two binary searches), |chg_diff| filtering is a boolean mask,
+and top-k uses np.argpartition so only the k selected rows get sorted.
+"""
+
+import numpy as np
+import pandas as pd
+
+# label -> (column, descending, absolute value)
+ORDERINGS = {
+    "chg_diff ↓": ("chg_diff", True, False),
+    "chg_diff ↑": ("chg_diff", False, False),
+    "|chg_diff| ↓": ("chg_diff", True, True),
+    "price_diff ↓": ("price_diff", True, False),
+    "price_diff ↑": ("price_diff", False, False),
+}
+DEFAULT_ORDER = "chg_diff ↓"
+
+
+class ResultView:
+    """Index structures over one result frame, built once and reused across reruns.
+
+    The frame is expected in the engine's order (chg_diff descending, NaN last).
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        symbols = np.array(frame["Symbol"].astype(object).fillna("").astype(str).str.upper(), dtype=str)
+        self._by_symbol = np.argsort(symbols, kind="stable")
+        self._symbols_sorted = symbols[self._by_symbol]
+        self._values = {col: frame[col].to_numpy(dtype=float, na_value=np.nan) for col in ("chg_diff", "price_diff")}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def select(self, min_abs_chg=None, symbol_prefix="", order=DEFAULT_ORDER, top_k=None) -> np.ndarray:
+        """Row positions matching the filters, in display order."""
+        prefix = symbol_prefix.strip().upper()
+        if prefix:
+            lo = np.searchsorted(self._symbols_sorted, prefix, side="left")
+            hi = np.searchsorted(self._symbols_sorted, prefix + "\U0010ffff", side="left")
+            positions = np.sort(self._by_symbol[lo:hi])  # back to chg_diff order
+        else:
+            positions = np.arange(len(self.frame))
+
+        if min_abs_chg:
+            chg = self._values["chg_diff"][positions]
+            with np.errstate(invalid="ignore"):
+                positions = positions[np.abs(chg) > min_abs_chg]
+
+        column, descending, absolute = ORDERINGS[order]
+        natural = order == DEFAULT_ORDER
+        if natural and not top_k:
+            return positions
+
+        keys = self._values[column][positions]
+        if absolute:
+            keys = np.abs(keys)
+        if descending:
+            keys = -keys
+        keys = np.where(np.isnan(keys), np.inf, keys)  # NaN always last
+        if top_k and top_k < len(positions):
+            part = np.argpartition(keys, top_k - 1)[:top_k]
+            positions, keys = positions[part], keys[part]
+        if natural:
+            return np.sort(positions)
+        return positions[np.argsort(keys, kind="stable")]
+
+    def page(self, positions: np.ndarray, page_no: int, page_size: int) -> pd.DataFrame:
+        start = page_no * page_size
+        return self.frame.iloc[positions[start:start + page_size]]
@@ -0,0 +1,112 @@
+"""
+shop_db.py
+Connection layer for the mobile shop SQLite database.
+
+Instead of opening a fresh sqlite3 connection for every helper call, each
+thread keeps one long-lived connection (a small per-thread pool, which is
+also what SQLite's threading rules want). Connections are opened with WAL
+journaling, synchronous=NORMAL, memory-mapped I/O and a larger prepared
+statement cache, and run in autocommit mode so writes are grouped with
+explicit transactions. With SQL_PROFILE=1 they are profiled (sql_profiler.py).
+
+A thread's connection is closed when the thread exits (a finalizer on its
+thread-local holder), so short-lived threads, like the one Streamlit starts
+for every rerun, don't pile up open connections and file descriptors.
+"""
+
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+import sql_profiler
+
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 64 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -16000),  # KiB
+    ("busy_timeout", 5000),  # ms to wait for another writer
+]
+STATEMENT_CACHE = 256
+
+
+class _Holder:
+    # lives in the thread-local, so it is freed (and finalized) when the thread exits
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+class Database:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sql_profiler.connect(self.path, isolation_level=None, cached_statements=STATEMENT_CACHE)
+            conn.row_factory = sqlite3.Row
+            for name, value in PRAGMAS:
+                conn.execute(f"PRAGMA {name}={value}")
+            holder = self._local.holder = _Holder(conn)
+            with self._lock:
+                self._connections.add(conn)
+            weakref.finalize(holder, self._release, conn)
+        return holder.conn
+
+    def _release(self, conn):
+        with self._lock:
+            if conn not in self._connections:
+                return  # close() got it first
+            self._connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            pass  # finalized off its own thread (interpreter exit)
+
+    def execute(self, sql, params=()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def query(self, sql, params=()) -> list:
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchone()
+
+    def scalar(self, sql, params=(), default=None):
+        row = self.connection().execute(sql, params).fetchone()
+        return default if row is None or row[0] is None else row[0]
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """BEGIN ... COMMIT on this thread's connection; rolls back on error.
+
+        immediate=True takes the write lock up front (BEGIN IMMEDIATE), so a
+        read-then-write sequence can't be raced by another writer.
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        """Close every connection opened through this object (call on shutdown)."""
+        with self._lock:
+            conns, self._connections = self._connections, set()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # owned by another thread that has already gone
+        self._local = threading.local()
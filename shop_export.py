@@ -0,0 +1,138 @@
+"""
+shop_export.py
+Streaming exports of shop data to CSV, gzipped CSV or XLSX.
+
+Rows come off the cursor in fetchmany() chunks and go straight to a
+buffered csv writer (optionally through gzip) or an openpyxl write-only
+sheet, so memory stays flat whether the range holds ten sales or ten
+years of them. Computed columns (stock value, profit) and the money format
+(two-decimal text in CSV, numbers in XLSX) are done in SQL.
+A progress(done, total) callback is called after every chunk; raising from
+it aborts the export and the partial file is removed.
+"""
+
+import csv
+import gzip
+import os
+
+CHUNK_ROWS = 2000
+WRITE_BUFFER = 1 << 16
+
+
+def _money_text(expr):
+    # CSV keeps the two-decimal text the shop's exports have always had ("9000.00")
+    return f"printf('%.2f', {expr})"
+
+
+def _money_number(expr):
+    # XLSX gets numbers Excel can sum
+    return f"ROUND({expr}, 2)"
+
+
+# name -> (header, select(money), count) ; {where} is filled in for date ranges.
+# "sales" and "stock" keep the original CSV layouts; "sales_detail" is the wide one with cost and profit
+EXPORTS = {
+    "sales": (
+        ["ID", "Brand", "Model", "Qty", "TotalAmount", "Customer", "PaymentMode", "Date"],
+        lambda money: f"""
+           SELECT s.id, p.brand, p.model, s.qty, {money("s.total_amount")}, s.customer, s.payment_mode, s.date
+           FROM sales s LEFT JOIN products p ON p.id = s.product_id {{where}} ORDER BY s.date, s.id""",
+        "SELECT COUNT(*) FROM sales s {where}",
+    ),
+    "sales_detail": (
+        ["ID", "Date", "Brand", "Model", "IMEI", "Qty", "TotalAmount", "UnitCost", "Profit", "Customer", "PaymentMode"],
+        lambda money: f"""
+           SELECT s.id, s.date, p.brand, p.model, p.imei, s.qty, {money("s.total_amount")}, {money("s.unit_cost")},
+                  {money("s.total_amount - s.qty * COALESCE(s.unit_cost, 0)")}, s.customer, s.payment_mode
+           FROM sales s LEFT JOIN products p ON p.id = s.product_id {{where}} ORDER BY s.date, s.id""",
+        "SELECT COUNT(*) FROM sales s {where}",
+    ),
+    "stock": (
+        ["ID", "Brand", "Model", "IMEI", "PurchasePrice", "SellingPrice", "StockQty", "StockValue"],
+        lambda money: f"""
+           SELECT id, brand, model, imei, {money("purchase_price")}, {money("selling_price")}, stock_qty,
+                  {money("COALESCE(purchase_price, 0) * COALESCE(stock_qty, 0)")}
+           FROM products ORDER BY brand, model""",
+        "SELECT COUNT(*) FROM products",
+    ),
+}
+FORMATS = {".csv.gz": "csv.gz", ".csv": "csv", ".xlsx": "xlsx"}  # full suffixes: report.xlsx.gz is not a CSV
+
+
+def format_for(path) -> str:
+    name = os.path.basename(path).lower()
+    for suffix, fmt in FORMATS.items():
+        if name.endswith(suffix):
+            return fmt
+    raise ValueError(f"Don't know how to export to {os.path.basename(path)} (use .csv, .csv.gz or .xlsx)")
+
+
+def _query(kind, fmt, first=None, last=None):
+    header, select, count = EXPORTS[kind]
+    where, params = "", ()
+    if first or last:
+        where, params = "WHERE s.date BETWEEN ? AND ?", (first or "0000-00-00", last or "9999-99-99")
+    money = _money_number if fmt == "xlsx" else _money_text
+    return header, select(money).format(where=where), count.format(where=where), params
+
+
+def iter_chunks(db, sql, params=(), size=CHUNK_ROWS):
+    cur = db.connection().execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cur.close()
+
+
+def _write_csv(chunks, header, path, compress, progress, total):
+    opener = (lambda: gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)) if compress else \
+             (lambda: open(path, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER))
+    done = 0
+    with opener() as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for rows in chunks:
+            w.writerows(rows)
+            done += len(rows)
+            if progress:
+                progress(done, total)
+    return done
+
+
+def _write_xlsx(chunks, header, path, progress, total, sheet_title):
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)  # rows are streamed to a temp file, not kept
+    ws = wb.create_sheet(sheet_title)
+    ws.append(header)
+    done = 0
+    for rows in chunks:
+        for row in rows:
+            ws.append(tuple(row))
+        done += len(rows)
+        if progress:
+            progress(done, total)
+    wb.save(path)
+    return done
+
+
+def export(db, kind, path, first=None, last=None, progress=None) -> int:
+    """Write the `kind` export ("sales", "sales_detail" or "stock") to path; format from the
+    extension. Sales can be limited to dates first..last (inclusive). Returns the row count."""
+    fmt = format_for(path)
+    header, sql, count_sql, params = _query(kind, fmt, first, last)
+    total = db.scalar(count_sql, params, default=0)
+    chunks = iter_chunks(db, sql, params)
+    try:
+        if fmt == "xlsx":
+            return _write_xlsx(chunks, header, path, progress, total, kind.replace("_", " ").title())
+        return _write_csv(chunks, header, path, fmt == "csv.gz", progress, total)
+    except BaseException:
+        chunks.close()
+        if os.path.exists(path):
+            os.remove(path)  # don't leave half a file behind
+        raise
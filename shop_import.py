@@ -0,0 +1,227 @@
+"""
+shop_import.py
+Bulk import of products and purchase lines from CSV/Excel vendor invoices.
+
+The file is read in one pass as text, validated column-wise with pandas
+(no per-row Python checks), de-duplicated on IMEI against itself and the
+products table, and written with executemany inside a single BEGIN
+IMMEDIATE transaction. Rows that fail validation are returned with their
+file line number and a reason instead of aborting the import.
+
+Products file columns:  brand, model, imei, purchase_price, selling_price, qty
+Purchases file columns: product_id or imei, qty, [vendor], [date]
+Header names are matched case-insensitively; a few common aliases are known.
+"""
+
+import os
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+ALIASES = {
+    "quantity": "qty", "stock": "stock_qty", "cost": "purchase_price", "cost_price": "purchase_price",
+    "price": "selling_price", "mrp": "selling_price", "sale_price": "selling_price",
+    "imei_no": "imei", "imei_number": "imei", "id": "product_id", "supplier": "vendor",
+}
+SQL_CHUNK = 500  # bound parameters per IN (...) lookup
+
+
+class ImportResult:
+    def __init__(self, inserted, rejected, seconds):
+        self.inserted = inserted
+        self.rejected = rejected  # DataFrame: line, reason, then the raw columns
+        self.seconds = seconds
+
+    def summary(self):
+        return f"{self.inserted} row(s) imported, {len(self.rejected)} rejected in {self.seconds:.2f}s"
+
+    def write_rejected(self, path):
+        self.rejected.to_csv(path, index=False)
+
+
+# ------------------------
+# Reading and validation
+# ------------------------
+def _normalize(name):
+    key = str(name).strip().lower().replace(" ", "_").replace("-", "_")
+    return ALIASES.get(key, key)
+
+
+def read_rows(source) -> pd.DataFrame:
+    """Every cell as stripped text ("" when blank), normalized headers, index = file line number."""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if str(name).lower().endswith((".xlsx", ".xlsm")):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            df = pd.DataFrame([[_cell_text(v) for v in r] for r in rows], columns=list(header), dtype=object)
+        finally:
+            wb.close()
+    else:
+        df = pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True)
+    df.columns = [_normalize(c) for c in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
+    for col in df.columns:
+        df[col] = df[col].str.strip()
+    df.index = np.arange(2, len(df) + 2)  # header is line 1
+    # fully blank lines are noise, not rejects
+    return df[(df != "").any(axis=1)]
+
+
+def _cell_text(value):
+    # IMEIs and ids typed into Excel come back as floats; 3.5e14 must stay 350000000000000
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, date):  # a real date cell (datetime is a date too): YYYY-MM-DD, no time part
+        return value.isoformat()[:10]
+    return str(value)
+
+
+def _number(col: pd.Series) -> pd.Series:
+    return pd.to_numeric(col.str.replace(",", "", regex=False).str.lstrip("₹"), errors="coerce")
+
+
+class _Checks:
+    """First failing reason per row, built up one vectorized mask at a time."""
+
+    def __init__(self, index):
+        self.reason = pd.Series("", index=index, dtype=object)
+
+    def fail(self, mask, reason):
+        self.reason[np.asarray(mask) & (self.reason == "").to_numpy()] = reason
+
+    @property
+    def ok(self) -> np.ndarray:
+        return (self.reason == "").to_numpy()
+
+
+def _rejected(df, checks) -> pd.DataFrame:
+    bad = df[~checks.ok]
+    return pd.concat([pd.DataFrame({"line": bad.index, "reason": checks.reason[~checks.ok].to_numpy()}),
+                      bad.reset_index(drop=True)], axis=1)
+
+
+def _existing(conn, sql, keys) -> set:
+    """Values of `keys` found by `sql` (a query with one {marks} placeholder)."""
+    found = set()
+    for i in range(0, len(keys), SQL_CHUNK):
+        chunk = keys[i:i + SQL_CHUNK]
+        found.update(r[0] for r in conn.execute(sql.format(marks=",".join("?" * len(chunk))), chunk))
+    return found
+
+
+def _col(df, name):
+    return df[name] if name in df.columns else pd.Series("", index=df.index, dtype=object)
+
+
+# ------------------------
+# Imports
+# ------------------------
+def import_products(db, source, vendor=None, entry_date=None) -> ImportResult:
+    """Insert new products. With a vendor, each one also gets a purchase line
+    for its opening qty (an incoming invoice); otherwise it is an opening stock load."""
+    t0 = time.perf_counter()
+    df = read_rows(source)
+    if "qty" in df.columns and "stock_qty" not in df.columns:
+        df = df.rename(columns={"qty": "stock_qty"})
+    missing = [c for c in ("brand", "model") if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    entry_date = entry_date or datetime.now().strftime("%Y-%m-%d")
+
+    brand, model, imei = _col(df, "brand"), _col(df, "model"), _col(df, "imei")
+    pp = _number(_col(df, "purchase_price").replace("", "0"))
+    sp = _number(_col(df, "selling_price").replace("", "0"))
+    raw_qty = _col(df, "stock_qty")
+    # a unit with an IMEI is one phone unless the file says otherwise
+    qty = _number(raw_qty.where(raw_qty != "", np.where(imei != "", "1", "0")))
+
+    checks = _Checks(df.index)
+    checks.fail((brand == "") | (model == ""), "brand and model are required")
+    checks.fail(pp.isna() | sp.isna(), "price is not a number")
+    checks.fail((pp < 0) | (sp < 0), "negative price")
+    checks.fail(qty.isna() | (qty < 0) | (qty % 1 != 0), "qty must be a whole number >= 0")
+    checks.fail((imei != "") & imei.duplicated(keep="first"), "IMEI repeated in file")
+
+    with db.transaction(immediate=True) as conn:
+        candidates = imei[checks.ok & (imei != "").to_numpy()].unique().tolist()
+        taken = _existing(conn, "SELECT imei FROM products WHERE imei IN ({marks})", candidates)
+        checks.fail(imei.isin(taken), "IMEI already in products")
+
+        ok = checks.ok
+        rows = list(zip(brand[ok].tolist(), model[ok].tolist(), [i or None for i in imei[ok]],
+                        pp[ok].tolist(), sp[ok].tolist(), qty[ok].astype(int).tolist()))
+        insert = """
+            INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        if rows and vendor:
+            # the purchase lines need the real ids: one prepared INSERT ... RETURNING per row
+            new_ids = [conn.execute(insert + " RETURNING id", r).fetchone()[0] for r in rows]
+            conn.executemany("INSERT INTO purchases (product_id, qty, date, vendor) VALUES (?, ?, ?, ?)",
+                             [(pid, r[5], entry_date, vendor) for pid, r in zip(new_ids, rows) if r[5] > 0])
+        elif rows:
+            conn.executemany(insert, rows)
+    return ImportResult(len(rows), _rejected(df, checks), time.perf_counter() - t0)
+
+
+def import_purchases(db, source, vendor=None, entry_date=None) -> ImportResult:
+    """Record purchase lines against existing products (by product_id or IMEI) and add their stock."""
+    t0 = time.perf_counter()
+    df = read_rows(source)
+    if "qty" not in df.columns or ("product_id" not in df.columns and "imei" not in df.columns):
+        raise ValueError("Need a qty column and a product_id or imei column")
+    default_date = entry_date or datetime.now().strftime("%Y-%m-%d")
+
+    pid_raw, imei = _col(df, "product_id"), _col(df, "imei")
+    pid = _number(pid_raw)
+    qty = _number(df["qty"])
+    vendors = _col(df, "vendor").replace("", vendor or "")
+    dates = _col(df, "date").replace("", default_date)
+    parsed = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+
+    checks = _Checks(df.index)
+    checks.fail((pid_raw == "") & (imei == ""), "product_id or imei is required")
+    checks.fail((pid_raw != "") & (pid.isna() | (pid % 1 != 0)), "product_id is not a whole number")
+    checks.fail(qty.isna() | (qty <= 0) | (qty % 1 != 0), "qty must be a whole number > 0")
+    checks.fail(parsed.isna(), "date must be YYYY-MM-DD")
+    # the same IMEI can only arrive once per invoice
+    checks.fail((imei != "") & imei.duplicated(keep="first"), "IMEI repeated in file")
+
+    with db.transaction(immediate=True) as conn:
+        ok = checks.ok
+        by_imei = {}
+        wanted = imei[ok & (pid_raw == "").to_numpy()].unique().tolist()
+        for i in range(0, len(wanted), SQL_CHUNK):
+            chunk = wanted[i:i + SQL_CHUNK]
+            by_imei.update(conn.execute(
+                f"SELECT imei, id FROM products WHERE imei IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        resolved = pid.where(pid_raw != "", imei.map(by_imei))
+        checks.fail(resolved.isna(), "no product with this IMEI")
+        ids = resolved[checks.ok].astype(int).unique().tolist()
+        known = _existing(conn, "SELECT id FROM products WHERE id IN ({marks})", ids)
+        checks.fail(~resolved.isin(known), "unknown product_id")
+
+        ok = checks.ok
+        lines = pd.DataFrame({"pid": resolved[ok].astype(int), "qty": qty[ok].astype(int),
+                              "date": dates[ok], "vendor": vendors[ok]})
+        conn.executemany("INSERT INTO purchases (product_id, qty, date, vendor) VALUES (?, ?, ?, ?)",
+                         zip(lines["pid"].tolist(), lines["qty"].tolist(), lines["date"].tolist(),
+                             lines["vendor"].tolist()))
+        # one stock update per product, not per line
+        totals = lines.groupby("pid")["qty"].sum()
+        conn.executemany("UPDATE products SET stock_qty = stock_qty + ? WHERE id=?",
+                         zip(totals.to_numpy().tolist(), totals.index.tolist()))
+    return ImportResult(len(lines), _rejected(df, checks), time.perf_counter() - t0)
+
+
+def rejected_report_path(source):
+    base = source if isinstance(source, str) else "import"
+    return os.path.splitext(base)[0] + ".rejected.csv"
@@ -0,0 +1,381 @@
+"""
+shop_migrations.py
+Versioned schema migrations for mobileshop.db.
+
+The schema version lives in PRAGMA user_version. migrate() applies every
+migration newer than the file's version, each in its own transaction
+together with the version bump, so an existing database is upgraded in
+place and a failed step leaves it at the last good version.
+
+Usage:
+    python shop_migrations.py [mobileshop.db]            # upgrade
+    python shop_migrations.py [mobileshop.db] --check    # upgrade, then verify query plans
+"""
+
+import argparse
+import sqlite3
+import sys
+
+from shop_db import Database
+
+
+class MigrationError(Exception):
+    pass
+
+
+# ------------------------
+# Migrations (append only; never edit one that has shipped)
+# ------------------------
+def _base_tables(conn):
+    # the original init_db() schema; IF NOT EXISTS so pre-migration databases pass through
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        brand TEXT,
+        model TEXT,
+        imei TEXT,
+        purchase_price REAL,
+        selling_price REAL,
+        stock_qty INTEGER DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS purchases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER,
+        qty INTEGER,
+        date TEXT,
+        vendor TEXT,
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER,
+        qty INTEGER,
+        date TEXT,
+        customer TEXT,
+        payment_mode TEXT,
+        total_amount REAL,
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    )
+    """)
+
+
+def _indexes(conn):
+    # blank IMEIs (accessories) become NULL so the unique index only covers real ones
+    conn.execute("UPDATE products SET imei = NULL WHERE TRIM(imei) = ''")
+    conn.execute("UPDATE products SET imei = TRIM(imei) WHERE imei <> TRIM(imei)")
+    dupes = conn.execute("""
+        SELECT imei, COUNT(*), GROUP_CONCAT(id) FROM products
+        WHERE imei IS NOT NULL GROUP BY imei HAVING COUNT(*) > 1 LIMIT 20
+    """).fetchall()
+    if dupes:
+        listing = "\n".join(f"  IMEI {imei}: {n} products (ids {ids})" for imei, n, ids in dupes)
+        raise MigrationError("Cannot add the unique IMEI index, these IMEIs are used more than once:\n"
+                             f"{listing}\nFix or merge those products and start the app again.")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_product ON sales(product_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_purchases_product_date ON purchases(product_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_brand_model ON products(brand, model)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_imei ON products(imei)")
+    conn.execute("ANALYZE")
+
+
+def rebuild_summary(conn):
+    """Recompute the trigger-maintained totals from the base tables."""
+    conn.execute("DELETE FROM shop_totals")
+    conn.execute("""
+        INSERT INTO shop_totals (id, product_count, stock_value)
+        SELECT 1, COUNT(*), COALESCE(SUM(COALESCE(purchase_price, 0) * COALESCE(stock_qty, 0)), 0) FROM products
+    """)
+    conn.execute("DELETE FROM daily_sales")
+    conn.execute("""
+        INSERT INTO daily_sales (date, amount, qty, lines)
+        SELECT date, COALESCE(SUM(total_amount), 0), COALESCE(SUM(qty), 0), COUNT(*) FROM sales GROUP BY date
+    """)
+
+
+def _summary_tables(conn):
+    # dashboard numbers kept current by triggers, so reading them is a primary-key lookup
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS shop_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        product_count INTEGER NOT NULL,
+        stock_value REAL NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS daily_sales (
+        date TEXT PRIMARY KEY,
+        amount REAL NOT NULL,
+        qty INTEGER NOT NULL,
+        lines INTEGER NOT NULL
+    )
+    """)
+    value = "COALESCE({r}.purchase_price, 0) * COALESCE({r}.stock_qty, 0)"
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_products_totals_ins AFTER INSERT ON products BEGIN
+        UPDATE shop_totals SET product_count = product_count + 1,
+                               stock_value = stock_value + {value.format(r="NEW")} WHERE id = 1;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_products_totals_del AFTER DELETE ON products BEGIN
+        UPDATE shop_totals SET product_count = product_count - 1,
+                               stock_value = stock_value - {value.format(r="OLD")} WHERE id = 1;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_products_totals_upd AFTER UPDATE OF purchase_price, stock_qty ON products BEGIN
+        UPDATE shop_totals SET stock_value = stock_value - {value.format(r="OLD")} + {value.format(r="NEW")} WHERE id = 1;
+    END
+    """)
+    upsert = """
+        INSERT INTO daily_sales (date, amount, qty, lines)
+        VALUES ({r}.date, {sign}COALESCE({r}.total_amount, 0), {sign}COALESCE({r}.qty, 0), {sign}1)
+        ON CONFLICT(date) DO UPDATE SET amount = amount + excluded.amount,
+                                        qty = qty + excluded.qty, lines = lines + excluded.lines;
+    """
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_daily_ins AFTER INSERT ON sales BEGIN
+        {upsert.format(r="NEW", sign="")}
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_daily_del AFTER DELETE ON sales BEGIN
+        {upsert.format(r="OLD", sign="-")}
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_daily_upd AFTER UPDATE OF date, qty, total_amount ON sales BEGIN
+        {upsert.format(r="OLD", sign="-")}
+        {upsert.format(r="NEW", sign="")}
+    END
+    """)
+    rebuild_summary(conn)
+
+
+def _product_search(conn):
+    # external-content FTS5 index over products; shop_search falls back to LIKE without it
+    try:
+        conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            brand, model, imei, content='products', content_rowid='id', prefix='1 2 3'
+        )
+        """)
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return  # SQLite built without FTS5
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_ins AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, brand, model, imei) VALUES (NEW.id, NEW.brand, NEW.model, NEW.imei);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_del AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, brand, model, imei) VALUES ('delete', OLD.id, OLD.brand, OLD.model, OLD.imei);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_upd AFTER UPDATE OF brand, model, imei ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, brand, model, imei) VALUES ('delete', OLD.id, OLD.brand, OLD.model, OLD.imei);
+        INSERT INTO products_fts (rowid, brand, model, imei) VALUES (NEW.id, NEW.brand, NEW.model, NEW.imei);
+    END
+    """)
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+def rebuild_rollup(conn):
+    """Recompute sales_rollup from the sales table.
+
+    Legacy sales without a date or product can't be placed in a period or a
+    product group, so they stay out of the rollup (and out of the triggers).
+    """
+    conn.execute("DELETE FROM sales_rollup")
+    conn.execute("""
+        INSERT INTO sales_rollup (date, product_id, payment_mode, qty, amount, cost, lines)
+        SELECT date, product_id, COALESCE(payment_mode, ''), COALESCE(SUM(qty), 0), COALESCE(SUM(total_amount), 0),
+               COALESCE(SUM(qty * unit_cost), 0), COUNT(*)
+        FROM sales WHERE date IS NOT NULL AND product_id IS NOT NULL
+        GROUP BY date, product_id, COALESCE(payment_mode, '')
+    """)
+
+
+def _sales_rollup(conn):
+    # cost of goods is fixed at sale time, so later price edits don't rewrite old profit
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(sales)")]
+    if "unit_cost" not in columns:
+        conn.execute("ALTER TABLE sales ADD COLUMN unit_cost REAL")
+    conn.execute("""
+        UPDATE sales SET unit_cost = COALESCE((SELECT purchase_price FROM products WHERE id = sales.product_id), 0)
+        WHERE unit_cost IS NULL
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_rollup (
+        date TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        payment_mode TEXT NOT NULL,
+        qty INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        cost REAL NOT NULL,
+        lines INTEGER NOT NULL,
+        PRIMARY KEY (date, product_id, payment_mode)
+    ) WITHOUT ROWID
+    """)
+    # bumped on every change that can alter a report; shop_reports caches against it
+    conn.execute("CREATE TABLE IF NOT EXISTS report_state (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO report_state (id, version) VALUES (1, 0)")
+    bump = "UPDATE report_state SET version = version + 1 WHERE id = 1;"
+    # rows are only counted once they carry a unit_cost (and a date and product, see rebuild_rollup)
+    upsert = """
+        INSERT INTO sales_rollup (date, product_id, payment_mode, qty, amount, cost, lines)
+        SELECT {r}.date, {r}.product_id, COALESCE({r}.payment_mode, ''), {sign}COALESCE({r}.qty, 0),
+               {sign}COALESCE({r}.total_amount, 0), {sign}COALESCE({r}.qty * {r}.unit_cost, 0), {sign}1
+        WHERE {r}.unit_cost IS NOT NULL AND {r}.date IS NOT NULL AND {r}.product_id IS NOT NULL
+        ON CONFLICT(date, product_id, payment_mode) DO UPDATE SET
+            qty = qty + excluded.qty, amount = amount + excluded.amount,
+            cost = cost + excluded.cost, lines = lines + excluded.lines;
+    """
+    # a sale inserted without unit_cost (older code paths) takes the product's current price;
+    # that UPDATE then counts it through trg_sales_rollup_upd
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_unit_cost AFTER INSERT ON sales WHEN NEW.unit_cost IS NULL BEGIN
+        UPDATE sales SET unit_cost = COALESCE((SELECT purchase_price FROM products WHERE id = NEW.product_id), 0)
+        WHERE id = NEW.id;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_ins AFTER INSERT ON sales BEGIN
+        {upsert.format(r="NEW", sign="")}
+        {bump}
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_del AFTER DELETE ON sales BEGIN
+        {upsert.format(r="OLD", sign="-")}
+        {bump}
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_upd AFTER UPDATE OF date, product_id, payment_mode, qty, total_amount, unit_cost ON sales BEGIN
+        {upsert.format(r="OLD", sign="-")}
+        {upsert.format(r="NEW", sign="")}
+        {bump}
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_products_report_state AFTER UPDATE OF brand, model ON products BEGIN
+        {bump}
+    END
+    """)
+    rebuild_rollup(conn)
+
+
+def _report_state_products(conn):
+    # a deleted product's rows fall out of breakdown(); renames are covered by trg_products_report_state
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_products_report_state_del AFTER DELETE ON products BEGIN
+        UPDATE report_state SET version = version + 1 WHERE id = 1;
+    END
+    """)
+
+
+MIGRATIONS = [
+    (1, "base tables", _base_tables),
+    (2, "secondary indexes, unique IMEI", _indexes),
+    (3, "trigger-maintained dashboard totals", _summary_tables),
+    (4, "full-text product search", _product_search),
+    (5, "daily sales rollup for period reports", _sales_rollup),
+    (6, "report cache invalidation on product delete", _report_state_products),
+]
+
+
+def schema_version(db) -> int:
+    return db.scalar("PRAGMA user_version", default=0)
+
+
+def migrate(db) -> list:
+    """Bring the database up to the latest version; returns the versions applied."""
+    applied = []
+    for version, description, step in MIGRATIONS:
+        # re-read inside the write lock: another process may have migrated meanwhile
+        with db.transaction(immediate=True) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    return applied
+
+
+# ------------------------
+# Query plan check
+# ------------------------
+# (label, statement as the app runs it, index it must use)
+PLAN_CHECKS = [
+    ("todays_sales", """
+        SELECT s.id, s.product_id, p.brand, p.model, s.qty, s.total_amount, s.customer, s.payment_mode, s.date
+        FROM sales s JOIN products p ON s.product_id = p.id
+        WHERE s.date = ?
+        ORDER BY s.id DESC
+    """, ("2024-01-01",), "idx_sales_date"),
+    ("list_products", "SELECT * FROM products ORDER BY brand, model", (), "idx_products_brand_model"),
+    ("stock_report", "SELECT id, brand, model, imei, purchase_price, selling_price, stock_qty FROM products ORDER BY brand, model",
+     (), "idx_products_brand_model"),
+    ("sales_by_product", "SELECT SUM(qty) FROM sales WHERE product_id = ?", (1,), "idx_sales_product"),
+    ("purchases_by_product", "SELECT qty, date, vendor FROM purchases WHERE product_id = ? AND date >= ? ORDER BY date",
+     (1, "2024-01-01"), "idx_purchases_product_date"),
+    ("imei_lookup", "SELECT id FROM products WHERE imei = ?", ("350000000000000",), "idx_products_imei"),
+    ("period_report", "SELECT SUM(qty), SUM(amount), SUM(cost) FROM sales_rollup WHERE date BETWEEN ? AND ?",
+     ("2024-01-01", "2024-01-31"), "PRIMARY KEY"),
+]
+
+
+def query_plan(db, sql, params=()) -> list:
+    return [row[3] for row in db.query("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_plans(db) -> list:
+    """[(label, problem, plan)] for statements that miss their index or sort in a temp B-tree."""
+    problems = []
+    for label, sql, params, index in PLAN_CHECKS:
+        plan = query_plan(db, sql, params)
+        text = " | ".join(plan)
+        if index not in text:
+            problems.append((label, f"does not use {index}", text))
+        elif "TEMP B-TREE" in text:
+            problems.append((label, "sorts in a temp B-tree", text))
+    return problems
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("db", nargs="?", default="mobileshop.db")
+    ap.add_argument("--check", action="store_true", help="verify the app's queries use their indexes")
+    args = ap.parse_args(argv)
+
+    db = Database(args.db)
+    try:
+        before = schema_version(db)
+        applied = migrate(db)
+        print(f"{args.db}: schema version {before} -> {schema_version(db)}" if applied else
+              f"{args.db}: schema version {before}, up to date")
+        if not args.check:
+            return 0
+        problems = check_plans(db)
+        for label, problem, plan in problems:
+            print(f"FAIL {label}: {problem}\n     {plan}")
+        print(f"{len(PLAN_CHECKS) - len(problems)}/{len(PLAN_CHECKS)} query plans OK")
+        return 1 if problems else 0
+    except MigrationError as e:
+        print(e)
+        return 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+shop_reports.py
+Period sales reports (day / week / month / custom range) for the shop.
+
+Everything reads the sales_rollup table (migration 5): one row per date x
+product x payment mode, kept current by triggers on sales. A year of
+history is a few thousand rollup rows however many bills it held, and
+range filters use the table's (date, ...) primary key. Results are cached
+per (report, range) and thrown away when report_state.version moves, which
+the same triggers bump on every sale change, as do product renames and
+deletes (migration 6), since breakdown() labels rows from products.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+PERIODS = ["Today", "Yesterday", "This week", "Last 7 days", "This month", "Last month",
+           "Last 30 days", "This year", "Custom"]
+GROUPINGS = ["Day", "Week", "Month", "Brand", "Product", "Payment"]
+
+# grouping -> (key expression, label expression, join products?)
+_GROUP_SQL = {
+    "Day": ("r.date", "r.date", False),
+    "Week": ("strftime('%Y-W%W', r.date)", "strftime('%Y-W%W', r.date)", False),
+    "Month": ("substr(r.date, 1, 7)", "substr(r.date, 1, 7)", False),
+    "Brand": ("COALESCE(p.brand, '?')", "COALESCE(p.brand, '?')", True),
+    "Product": ("r.product_id", "r.product_id || ' - ' || COALESCE(p.brand, '?') || ' ' || COALESCE(p.model, '')", True),
+    "Payment": ("r.payment_mode", "r.payment_mode", False),
+}
+
+
+def period_range(period, today=None, start=None, end=None):
+    """(first_day, last_day) as ISO strings, both inclusive. "Custom" uses start/end."""
+    today = today or date.today()
+    if period == "Today":
+        first = last = today
+    elif period == "Yesterday":
+        first = last = today - timedelta(days=1)
+    elif period == "This week":
+        first, last = today - timedelta(days=today.weekday()), today
+    elif period == "Last 7 days":
+        first, last = today - timedelta(days=6), today
+    elif period == "This month":
+        first, last = today.replace(day=1), today
+    elif period == "Last month":
+        last = today.replace(day=1) - timedelta(days=1)
+        first = last.replace(day=1)
+    elif period == "Last 30 days":
+        first, last = today - timedelta(days=29), today
+    elif period == "This year":
+        first, last = today.replace(month=1, day=1), today
+    elif period == "Custom":
+        first, last = date.fromisoformat(str(start)), date.fromisoformat(str(end))
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    if first > last:
+        raise ValueError("Start date is after end date")
+    return first.isoformat(), last.isoformat()
+
+
+class Reports:
+    def __init__(self, db, cache_size=64):
+        self.db = db
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()  # reports are built on worker threads
+
+    def version(self):
+        return self.db.scalar("SELECT version FROM report_state WHERE id = 1", default=0)
+
+    def _cached(self, key, build):
+        version = self.version()
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = build()
+        with self._lock:
+            if version == self._version:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def summary(self, first, last) -> dict:
+        """Totals over the range: qty, amount, cost, profit, lines."""
+        def build():
+            row = self.db.query_one("""
+                SELECT COALESCE(SUM(qty), 0), COALESCE(SUM(amount), 0), COALESCE(SUM(cost), 0), COALESCE(SUM(lines), 0)
+                FROM sales_rollup WHERE date BETWEEN ? AND ?
+            """, (first, last))
+            qty, amount, cost, lines = row
+            return {"qty": qty, "amount": amount, "cost": cost, "profit": amount - cost, "lines": lines}
+        return self._cached(("summary", first, last), build)
+
+    def breakdown(self, first, last, by="Day", limit=None) -> list:
+        """[(label, qty, amount, cost, profit, lines)] grouped by `by` (see GROUPINGS).
+        Time groupings are in date order, the others by amount, largest first."""
+        if by not in _GROUP_SQL:
+            raise ValueError(f"Unknown grouping: {by}")
+        key, label, join = _GROUP_SQL[by]
+        order = f"{key}" if by in ("Day", "Week", "Month") else "amount DESC"
+
+        def build():
+            rows = self.db.query(f"""
+                SELECT {label} AS label, SUM(r.qty) AS qty, SUM(r.amount) AS amount, SUM(r.cost) AS cost, SUM(r.lines) AS lines
+                FROM sales_rollup r {"LEFT JOIN products p ON p.id = r.product_id" if join else ""}
+                WHERE r.date BETWEEN ? AND ?
+                GROUP BY {key}
+                HAVING SUM(r.lines) <> 0
+                ORDER BY {order}
+                {"LIMIT " + str(int(limit)) if limit else ""}
+            """, (first, last))
+            return [(r["label"], r["qty"], r["amount"], r["cost"], r["amount"] - r["cost"], r["lines"]) for r in rows]
+        return self._cached(("breakdown", by, first, last, limit), build)
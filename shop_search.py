@@ -0,0 +1,58 @@
+"""
+shop_search.py
+Product search for the shop entry windows.
+
+Queries the products_fts FTS5 index (migration 4, kept in sync by triggers
+on products) with prefix matching on every word typed, so "sam a5" finds
+"Samsung Galaxy A52" in a few milliseconds regardless of catalogue size.
+Exact IMEI lookups for barcode scanners go through the unique
+products(imei) index. Without FTS5 the same API falls back to LIKE.
+"""
+
+import re
+
+RESULT_COLS = "p.id, p.brand, p.model, p.imei, p.stock_qty, p.selling_price"
+
+
+def label(row) -> str:
+    """How a product is shown in pickers."""
+    imei = f" [{row['imei']}]" if row["imei"] else ""
+    return f"{row['id']} - {row['brand']} {row['model']}{imei} (Stock: {row['stock_qty']})"
+
+
+def looks_like_imei(text) -> bool:
+    return bool(re.fullmatch(r"\d{14,16}", text.strip()))
+
+
+class ProductSearch:
+    def __init__(self, db):
+        self.db = db
+        self._fts = None
+
+    @property
+    def has_fts(self) -> bool:
+        if self._fts is None:
+            self._fts = self.db.scalar("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'", default=0) == 1
+        return self._fts
+
+    def search(self, text, limit=20) -> list:
+        """Products matching every word of `text` as a prefix, best matches first."""
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return []
+        if self.has_fts:
+            match = " ".join(f'"{w}"*' for w in words)
+            return self.db.query(f"""
+                SELECT {RESULT_COLS} FROM products_fts f JOIN products p ON p.id = f.rowid
+                WHERE products_fts MATCH ? ORDER BY f.rank LIMIT ?
+            """, (match, limit))
+        where = " AND ".join("(p.brand LIKE ? OR p.model LIKE ? OR p.imei LIKE ?)" for _ in words)
+        params = [f"%{w}%" for w in words for _ in range(3)]
+        return self.db.query(f"SELECT {RESULT_COLS} FROM products p WHERE {where} ORDER BY p.brand, p.model LIMIT ?",
+                             params + [limit])
+
+    def by_imei(self, imei):
+        return self.db.query_one(f"SELECT {RESULT_COLS} FROM products p WHERE p.imei = ?", (imei.strip(),))
+
+    def by_id(self, pid):
+        return self.db.query_one(f"SELECT {RESULT_COLS} FROM products p WHERE p.id = ?", (pid,))
@@ -0,0 +1,268 @@
+"""
+sql_profiler.py
+Opt-in query and UI-path timing for the shop apps.
+
+Start mobile_shop_app.py or deva with SQL_PROFILE=1 and every connection
+opened through shop_db.Database or sqlite_writer comes up as a
+ProfiledConnection. A statement is timed from execute() until its cursor is
+exhausted, re-executed, closed or dropped, so fetching the rows counts along
+with running the query, and the rows it returned (rows changed, for
+INSERT/UPDATE/DELETE) are counted. Statements are grouped by template:
+string and number literals and ?-lists are collapsed, so "WHERE id = 7" and
+"WHERE id = 8" are one line of the report.
+
+timed(name), as a decorator or a with-block, times a UI path such as a page
+render; TaskRunner records a labelled task's round trip (submit to on_done
+finished) the same way, which is how refresh_dashboard is timed.
+
+Per template / path: count, total, mean, p95 (of the last SAMPLES timings),
+max and rows. query_report()/path_report() return them as dicts for the
+admin views, format_report() as text, and with SQL_PROFILE_REPORT=<file>
+the text report is written there at exit.
+
+Off (the default) connect() is plain sqlite3.connect and timed() hands the
+function back unchanged, so nothing is paid.
+"""
+
+import atexit
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from functools import lru_cache, wraps
+from time import perf_counter
+
+ENABLED = os.environ.get("SQL_PROFILE", "").strip().lower() not in ("", "0", "false", "no", "off")
+REPORT_FILE = os.environ.get("SQL_PROFILE_REPORT", "")
+SAMPLES = 1000  # timings kept per template for the p95
+
+QUERY_COLUMNS = ["template", "count", "total_ms", "mean_ms", "p95_ms", "max_ms", "rows"]
+PATH_COLUMNS = ["path", "count", "total_ms", "mean_ms", "p95_ms", "max_ms"]
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.])")
+_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def template(sql) -> str:
+    """sql with literals replaced by ? and whitespace collapsed."""
+    sql = _LITERAL.sub("?", sql)
+    return _SPACE.sub(" ", _LIST.sub("?, ...", sql)).strip()
+
+
+class Stat:
+    __slots__ = ("count", "total", "max", "rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, seconds, rows=0):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.samples.append(seconds)
+
+    def row(self, key):
+        s = sorted(self.samples)
+        p95 = s[min(len(s) - 1, int(len(s) * 0.95))] if s else 0.0
+        return [key, self.count, self.total * 1000, self.total / self.count * 1000, p95 * 1000, self.max * 1000,
+                self.rows]
+
+
+_lock = threading.Lock()
+_queries = {}
+_paths = {}
+
+
+def record_query(sql, seconds, rows=0):
+    key = template(sql)
+    with _lock:
+        stat = _queries.get(key) or _queries.setdefault(key, Stat())
+        stat.add(seconds, rows)
+
+
+def record_path(name, seconds):
+    if not ENABLED:
+        return
+    with _lock:
+        stat = _paths.get(name) or _paths.setdefault(name, Stat())
+        stat.add(seconds)
+
+
+def _report(stats, columns):
+    with _lock:
+        rows = [stat.row(key) for key, stat in stats.items()]
+    rows.sort(key=lambda r: -r[2])
+    return [dict(zip(columns, r[:len(columns)])) for r in rows]
+
+
+def query_report() -> list:
+    """One dict per statement template (QUERY_COLUMNS), most total time first."""
+    return _report(_queries, QUERY_COLUMNS)
+
+
+def path_report() -> list:
+    """One dict per timed UI path (PATH_COLUMNS), most total time first."""
+    return _report(_paths, PATH_COLUMNS)
+
+
+def reset():
+    with _lock:
+        _queries.clear()
+        _paths.clear()
+
+
+def format_report(limit=40) -> str:
+    def table(title, rows, columns):
+        lines = [f"{title} ({len(rows)})",
+                 f"{'count':>8} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"
+                 + (f" {'rows':>9}" if "rows" in columns else "") + f"  {columns[0]}"]
+        for r in rows[:limit]:
+            lines.append(f"{r['count']:>8} {r['total_ms']:>10.1f} {r['mean_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                         f"{r['max_ms']:>9.2f}" + (f" {r['rows']:>9}" if "rows" in r else "") + f"  {r[columns[0]]}")
+        return "\n".join(lines)
+
+    return (table("UI paths", path_report(), PATH_COLUMNS) + "\n\n"
+            + table("Statements", query_report(), QUERY_COLUMNS) + "\n")
+
+
+def dump(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(format_report(limit=None))
+
+
+# ---- timing UI paths ----
+class timed:
+    """Time a UI path: @timed("name") on a function, or `with timed("name"):`."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_path(self.name, perf_counter() - t0)
+        return wrapper
+
+    def __enter__(self):
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_path(self.name, perf_counter() - self._t0)
+
+
+# ---- statement timing ----
+class ProfiledCursor(sqlite3.Cursor):
+    _sql = None  # statement being timed, until its rows are used up
+    _elapsed = 0.0
+    _rows = 0
+
+    def _flush(self):
+        if self._sql is not None:
+            record_query(self._sql, self._elapsed, self._rows)
+            self._sql = None
+
+    def _timed(self, sql, run, *args):
+        self._flush()
+        t0 = perf_counter()
+        try:
+            return run(*args)
+        finally:
+            self._sql, self._elapsed, self._rows = sql, perf_counter() - t0, 0
+            if self.description is None:  # no result set: the statement is done
+                self._rows = max(self.rowcount, 0)
+                self._flush()
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sql, super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self._timed(script, super().executescript, script)
+
+    def _fetched(self, t0, n, done):
+        if self._sql is not None:
+            self._elapsed += perf_counter() - t0
+            self._rows += n
+            if done:
+                self._flush()
+
+    def fetchone(self):
+        t0 = perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t0 = perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(t0, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        t0 = perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows), True)
+        return rows
+
+    def __next__(self):
+        t0 = perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, 0, True)
+            raise
+        self._fetched(t0, 1, False)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    # Connection.execute() and friends make their cursor in C without going
+    # through cursor(), so route them explicitly
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def connect(path, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect(), profiled when SQL_PROFILE is set."""
+    if ENABLED:
+        kwargs.setdefault("factory", ProfiledConnection)
+    return sqlite3.connect(path, **kwargs)
+
+
+if ENABLED and REPORT_FILE:
+    atexit.register(dump, REPORT_FILE)
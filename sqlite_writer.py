@@ -0,0 +1,144 @@
+"""
+sqlite_writer.py
+One writer thread per SQLite file, committing queued writes in groups.
+
+Callers on any thread submit(fn, *args) and get a concurrent.futures.Future
+back. The writer thread owns the only write connection: it takes the first
+queued write plus everything else already waiting (up to max_batch) and
+runs the group inside one BEGIN IMMEDIATE ... COMMIT. Whatever arrives
+while that commit runs forms the next group, so groups grow with load and
+a lone write doesn't wait. batch_ms > 0 also holds the group open that
+long for stragglers, which only pays when commits are slow (synchronous=
+FULL on a slow disk); with WAL + synchronous=NORMAL it just adds latency
+(see bench_deva_writes.py --batch-ms).
+
+Each write gets its own SAVEPOINT, so one failing write rolls back alone
+and its future carries the exception while the rest of the group still
+commits. Futures are resolved only after the COMMIT, so a result means the
+write is in the database.
+
+With many sessions writing at once this turns N commits (and N WAL syncs)
+into one, and no connection or cursor is ever used by two threads. Reads
+don't go through here; use a per-thread connection (shop_db.Database).
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import sql_profiler
+from shop_db import PRAGMAS
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, path, batch_ms=0.0, max_batch=256, pragmas=PRAGMAS):
+        self.path = path
+        self.batch_ms = batch_ms
+        self.max_batch = max_batch
+        self.pragmas = pragmas
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._open_error = None
+        self.commits = 0  # groups committed
+        self.writes = 0   # writes in them
+        self._thread = threading.Thread(target=self._loop, name=f"sqlite-writer:{path}", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._open_error is not None:
+            raise self._open_error
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue fn(conn, *args, **kwargs) to run on the writer connection.
+        The future resolves to fn's return value once its group has committed."""
+        if not self._thread.is_alive():
+            raise RuntimeError("writer is closed")
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn, *args, timeout=30, **kwargs):
+        """submit() and wait for the result."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def close(self, timeout=10):
+        """Commit whatever is queued, then stop the thread and close the connection."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    # ---- writer thread ----
+    def _open(self):
+        conn = sql_profiler.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def _loop(self):
+        try:
+            conn = self._open()
+        except BaseException as e:
+            self._open_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        stopping = False
+        try:
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                group, stopping = self._collect(first)
+                self._commit(conn, group)
+        finally:
+            conn.close()
+
+    def _collect(self, first):
+        group = [first]
+        deadline = time.perf_counter() + self.batch_ms / 1000
+        while len(group) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _commit(self, conn, group):
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, fn, args, kwargs in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT w")
+                try:
+                    result = fn(conn, *args, **kwargs)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO w")
+                    conn.execute("RELEASE w")
+                    future.set_exception(e)
+                    continue
+                conn.execute("RELEASE w")
+                done.append((future, result))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _ in done:
+                future.set_exception(e)
+            for future, *_ in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.commits += 1
+        self.writes += len(done)
+        for future, result in done:
+            future.set_result(result)
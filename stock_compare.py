@@ -0,0 +1,156 @@
+"""
+stock_compare.py
+Headless stock comparison: the same pipeline as streamlit_app.py, usable
+from other code or from the command line for batch runs.
+
+Examples:
+    python stock_compare.py old.xlsx new.xlsx -o out --format csv pdf
+    python stock_compare.py --manifest pairs.csv -o out --workers 8 --format parquet
+    python stock_compare.py old.xlsx new.xlsx --match fuzzy   # tolerate respelled keys
+
+A manifest is a CSV with columns file1,file2 and an optional name; relative
+paths are resolved against the manifest's folder. Pairs run concurrently in
+a process pool. Only pandas/numpy/openpyxl and pyarrow (numeric_clean's
+parsing kernels) are imported up front; reportlab is loaded only when PDF
+output is requested, and streamlit never is.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from compare_engine import ComparisonResult, compare
+from excel_ingest import REQUIRED_COLS, read_stock_sheet
+from symbol_match import MODES
+
+OUTPUT_FORMATS = ["csv", "parquet", "xlsx", "pdf"]
+
+
+def compare_files(path1, path2, columns=REQUIRED_COLS, mode="exact") -> ComparisonResult:
+    """Read two exports and compare them (file 2 against file 1)."""
+    return compare(read_stock_sheet(path1, columns), read_stock_sheet(path2, columns), mode=mode)
+
+
+def write_outputs(result: ComparisonResult, out_dir, name, formats, unmatched=False, **pdf_options) -> list:
+    from exports import FORMATS, export
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{FORMATS[fmt][1]}")
+        export(result.matched, fmt, path, **(pdf_options if fmt == "pdf" else {}))
+        written.append(path)
+    if unmatched:
+        for suffix, frame in [("only_file1", result.left_only), ("only_file2", result.right_only)]:
+            path = os.path.join(out_dir, f"{name}.{suffix}.csv")
+            export(frame, "csv", path)
+            written.append(path)
+    return written
+
+
+def run_pair(job) -> dict:
+    """Worker entry point: compare one pair and write its outputs. Never raises."""
+    name, path1, path2, out_dir, formats, unmatched, pdf_options, mode = job
+    t0 = time.perf_counter()
+    summary = {"name": name, "file1": path1, "file2": path2}
+    try:
+        result = compare_files(path1, path2, mode=mode)
+        summary["outputs"] = write_outputs(result, out_dir, name, formats, unmatched, **pdf_options)
+        summary.update(matched=len(result.matched), only_file1=len(result.left_only),
+                       only_file2=len(result.right_only), error="")
+    except Exception as e:
+        summary.update(outputs=[], matched=0, only_file1=0, only_file2=0, error=f"{type(e).__name__}: {e}")
+    summary["seconds"] = round(time.perf_counter() - t0, 3)
+    return summary
+
+
+def read_manifest(path) -> list:
+    """[(name, file1, file2)] from a manifest CSV; name is "" when the column is absent or blank."""
+    base = os.path.dirname(os.path.abspath(path))
+    pairs = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            file1 = os.path.join(base, row["file1"].strip())
+            file2 = os.path.join(base, row["file2"].strip())
+            pairs.append(((row.get("name") or "").strip(), file1, file2))
+    return pairs
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _default_names(pairs) -> list:
+    return [(name or f"{i:04d}_{_stem(p1)}_vs_{_stem(p2)}", p1, p2) for i, (name, p1, p2) in enumerate(pairs, start=1)]
+
+
+def run_batch(pairs, out_dir, formats, workers=None, unmatched=False, pdf_options=None, progress=None,
+              mode="exact") -> list:
+    """Compare (name, file1, file2) pairs across a worker pool; returns one summary per pair."""
+    jobs = [(name, p1, p2, out_dir, formats, unmatched, pdf_options or {}, mode) for name, p1, p2 in pairs]
+    if workers == 1 or len(jobs) <= 1:
+        results = []
+        for job in jobs:
+            results.append(run_pair(job))
+            if progress:
+                progress(results[-1])
+        return results
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_pair, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(results[futures[future]])
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*", help="file pairs: file1 file2 [file1 file2 ...]")
+    ap.add_argument("--manifest", help="CSV with file1,file2[,name] columns")
+    ap.add_argument("-o", "--out-dir", default="comparisons")
+    ap.add_argument("--format", nargs="+", choices=OUTPUT_FORMATS, default=["csv"], dest="formats")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--unmatched", action="store_true", help="also write rows found in only one file")
+    ap.add_argument("--match", choices=MODES, default="exact",
+                    help="key matching: exact, normalized (case/space/suffix-insensitive) or fuzzy")
+    ap.add_argument("--pdf-mode", choices=["full", "movers"], default="full")
+    ap.add_argument("--top-n", type=int, default=25, help="rows per side for --pdf-mode movers")
+    ap.add_argument("--summary", help="write the per-pair summary to this CSV")
+    args = ap.parse_args(argv)
+
+    if len(args.files) % 2:
+        ap.error("files must be given in pairs")
+    pairs = [("", a, b) for a, b in zip(args.files[::2], args.files[1::2])]
+    if args.manifest:
+        pairs += read_manifest(args.manifest)
+    pairs = _default_names(pairs)
+    if not pairs:
+        ap.error("nothing to compare: pass file pairs or --manifest")
+
+    def progress(s):
+        status = s["error"] or f"{s['matched']} matched, {s['only_file1']}/{s['only_file2']} unmatched"
+        print(f"[{s['seconds']:7.2f}s] {s['name']}: {status}", flush=True)
+
+    t0 = time.perf_counter()
+    pdf_options = {"mode": args.pdf_mode, "top_n": args.top_n}
+    results = run_batch(pairs, args.out_dir, args.formats, args.workers, args.unmatched, pdf_options, progress,
+                        args.match)
+    failed = [r for r in results if r["error"]]
+    print(f"{len(results)} pair(s) in {time.perf_counter() - t0:.2f}s, {len(failed)} failed")
+
+    if args.summary:
+        with open(args.summary, "w", newline="", encoding="utf-8") as f:
+            fields = ["name", "file1", "file2", "matched", "only_file1", "only_file2", "seconds", "error"]
+            w = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(results)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,85 +1,203 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
+import numpy as np
+
+from excel_ingest import PARSE_VERSION, MissingColumnsError
+from compare_engine import ComparisonEngine
+from symbol_match import MODES
+from diff_cube import METRICS, VIEWS, build_cube
+from ingest_scheduler import IngestScheduler
+from result_view import DEFAULT_ORDER, ORDERINGS, ResultView
+from exports import FORMATS, PDF_MODES, ExportCache
+from upload_cache import UploadCache
+from numeric_clean import bad_cells, bad_summary
 
 st.title("📊 Stock Comparison Tool")
 
+@st.cache_resource
+def get_upload_cache() -> UploadCache:
+    # one cache per server process, shared by every session
+    return UploadCache()
+
+@st.cache_resource
+def get_export_cache() -> ExportCache:
+    return ExportCache()
+
+@st.cache_resource
+def get_scheduler() -> IngestScheduler:
+    # worker processes are started once and reused across reruns
+    return IngestScheduler().start()
+
+upload_cache = get_upload_cache()
+export_cache = get_export_cache()
+scheduler = get_scheduler()
+
+mode = st.sidebar.radio("Mode", ["Two files", "Multi-file (time series)"])
+all_sheets = st.sidebar.checkbox("Read every sheet", value=False,
+                                 help="Parse all sheets of each workbook (in parallel) and stack them.")
+match_mode = st.sidebar.selectbox(
+    "Match rows on", MODES, format_func={"exact": "Exact name + symbol", "normalized": "Normalized keys",
+                                         "fuzzy": "Normalized + fuzzy names"}.get,
+    help="Normalized ignores case, spaces, punctuation, suffixes like -EQ and Ltd/Limited, and matches "
+         "renamed companies by symbol. Fuzzy also pairs similar names; check the confidence column.")
+
+def parse_uploads(files):
+    """Parse uploads through the cache; misses are parsed in the process pool."""
+    payloads = [f.getvalue() for f in files]
+    names = {id(data): f.name for data, f in zip(payloads, files)}
+
+    def parse_batch(batch):
+        report = scheduler.parse(batch, [names[id(data)] for data in batch], all_sheets=all_sheets)
+        st.session_state["ingest_report"] = report
+        return report.frames
+
+    tag = f"v{PARSE_VERSION}" + ("-all-sheets" if all_sheets else "")
+    return upload_cache.get_or_parse_many(payloads, parse_batch, tag=tag)
+
+def show_bad_cells(name, frame):
+    """Warn about numeric cells that couldn't be read (they are left blank)."""
+    cells = bad_cells(frame)
+    if not cells:
+        return
+    total = sum(len(rows) for rows in cells.values())
+    with st.expander(f"⚠️ {name}: {total} unreadable number(s), left blank"):
+        st.dataframe(bad_summary(frame), use_container_width=True, hide_index=True)
+        rows = np.unique(np.concatenate(list(cells.values())))
+        st.dataframe(frame.iloc[rows[:200]], use_container_width=True)
+        if len(rows) > 200:
+            st.caption(f"First 200 of {len(rows)} rows shown.")
+
+def show_ingest_report():
+    report = st.session_state.get("ingest_report")
+    if report is None:
+        return
+    with st.expander("⏱ Parse timings (last parse)"):
+        st.dataframe(report.to_frame(), use_container_width=True)
+        st.caption(f"{len(report.stats)} job(s) on {report.workers} worker(s): "
+                   f"wall {report.wall:.2f}s, summed parse {report.parse_seconds:.2f}s, "
+                   f"speedup {report.speedup:.1f}×")
+
 # Upload files
-file1 = st.file_uploader("Upload File 1", type=["xlsx"])
-file2 = st.file_uploader("Upload File 2", type=["xlsx"])
-
-def generate_pdf(dataframe: pd.DataFrame) -> BytesIO:
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    elements.append(Paragraph("Stock Comparison Report", styles['Title']))
-
-    table_data = [list(dataframe.columns)] + dataframe.astype(str).values.tolist()
-    table = Table(table_data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        ('BOTTOMPADDING', (0,0), (-1,0), 6),
-        ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-    ]))
-    elements.append(table)
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+if mode == "Two files":
+    file1 = st.file_uploader("Upload File 1", type=["xlsx"])
+    file2 = st.file_uploader("Upload File 2", type=["xlsx"])
+else:
+    file1 = file2 = None
+    files = st.file_uploader("Upload daily exports (ordered by file name)", type=["xlsx"], accept_multiple_files=True)
 
 if file1 and file2:
     try:
-        # Read: skip title row
-        df1 = pd.read_excel(file1, skiprows=1)
-        df2 = pd.read_excel(file2, skiprows=1)
+        # Read: header row is located automatically, only required columns are kept
+        try:
+            (key1, key2), (df1, df2) = parse_uploads([file1, file2])
+        except MissingColumnsError:
+            df1 = df2 = None
 
-        required_cols = ["Stock Name", "Symbol", "% Chg", "Price"]
-        if not all(col in df1.columns for col in required_cols) or not all(col in df2.columns for col in required_cols):
+        if df1 is None or df2 is None:
             st.error("❌ Missing required columns. Make sure both files have: Stock Name, Symbol, % Chg, Price.")
         else:
-            # Merge on Stock Name + Symbol
-            merged = pd.merge(df1, df2, on=["Stock Name", "Symbol"], suffixes=("_1", "_2"))
-
-            # Ensure numeric for calculations/sorting
-            for col in ["% Chg_1", "% Chg_2", "Price_1", "Price_2"]:
-                if col in merged.columns:
-                    merged[col] = pd.to_numeric(merged[col], errors="coerce")
+            # Index file 1 once per upload; a new file 2 only recomputes its side
+            if "engine" not in st.session_state:
+                st.session_state["engine"] = ComparisonEngine()
+            comparison = st.session_state["engine"].compare(key1, df1, key2, df2, mode=match_mode)
+            show_bad_cells(file1.name, df1)
+            show_bad_cells(file2.name, df2)
+            result = comparison.matched  # already ordered by chg_diff desc
 
-            # Differences
-            merged["chg_diff"] = merged["% Chg_2"] - merged["% Chg_1"]
-            merged["price_diff"] = merged["Price_2"] - merged["Price_1"]
+            st.success("✅ Comparison completed (ordered by chg_diff desc)!")
+            if match_mode != "exact" and len(result):
+                counts = result["match"].value_counts()
+                st.caption("Matched rows: " + ", ".join(f"{n} {how}" for how, n in counts.items())
+                           + f" · lowest confidence {result['confidence'].min():.2f}")
 
-            # Arrange columns
-            result = merged[
-                ["Stock Name", "Symbol",
-                 "% Chg_1", "% Chg_2", "chg_diff",
-                 "Price_1", "Price_2", "price_diff"]
-            ]
+            # Only the visible page is sent to the browser
+            result_key = f"{key1}:{key2}:{match_mode}"
+            cached_view = st.session_state.get("result_view")
+            if cached_view is None or cached_view[0] != result_key:
+                cached_view = (result_key, ResultView(result))
+                st.session_state["result_view"] = cached_view
+            view = cached_view[1]
 
-            # 👉 Sort by chg_diff DESC
-            result = result.sort_values(by="chg_diff", ascending=False)
+            f1, f2, f3, f4 = st.columns(4)
+            prefix = f1.text_input("Symbol starts with")
+            min_abs = f2.number_input("|chg_diff| >", min_value=0.0, value=0.0, step=0.5)
+            order = f3.selectbox("Order", list(ORDERINGS), index=list(ORDERINGS).index(DEFAULT_ORDER))
+            top_k = f4.number_input("Top k (0 = all)", min_value=0, value=0, step=10)
+            positions = view.select(min_abs_chg=min_abs, symbol_prefix=prefix, order=order, top_k=int(top_k))
 
-            st.success("✅ Comparison completed (ordered by chg_diff desc)!")
-            st.dataframe(result, use_container_width=True)
+            p1, p2 = st.columns(2)
+            page_size = p1.selectbox("Rows per page", [50, 100, 250, 500], index=1)
+            pages = max((len(positions) + page_size - 1) // page_size, 1)
+            page_no = p2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) - 1
+            st.dataframe(view.page(positions, page_no, page_size), use_container_width=True)
+            first = page_no * page_size
+            st.caption(f"Rows {min(first + 1, len(positions))}–{min(first + page_size, len(positions))} "
+                       f"of {len(positions)} matching ({len(view)} total)")
 
-            # Download as PDF
-            pdf_buffer = generate_pdf(result)
+            # Downloads are rendered only when the button is clicked, then memoised
+            c1, c2, c3 = st.columns(3)
+            fmt = c1.selectbox("Download format", list(FORMATS), index=list(FORMATS).index("pdf"),
+                               format_func=lambda f: FORMATS[f][0])
+            options = {}
+            if fmt == "pdf":
+                options["mode"] = c2.selectbox("PDF report", list(PDF_MODES), format_func=PDF_MODES.get)
+                options["top_n"] = int(c3.number_input("Movers per side", min_value=5, max_value=500, value=25, step=5,
+                                                       disabled=options["mode"] != "movers"))
+            label, ext, mime = FORMATS[fmt]
             st.download_button(
-                label="📥 Download as PDF",
-                data=pdf_buffer,
-                file_name="stock_comparison.pdf",
-                mime="application/pdf"
+                label=f"📥 Download as {label}",
+                data=lambda: export_cache.get(result, fmt, result_key=result_key, **options),
+                file_name=f"stock_comparison.{ext}",
+                mime=mime,
+                on_click="ignore",
             )
 
+            # Rows the inner join used to drop silently
+            with st.expander(f"Only in File 1 ({len(comparison.left_only)})"):
+                st.dataframe(comparison.left_only, use_container_width=True)
+            with st.expander(f"Only in File 2 ({len(comparison.right_only)})"):
+                st.dataframe(comparison.right_only, use_container_width=True)
+
     except Exception as e:
         st.error(f"⚠️ Error: {e}")
 
+if mode != "Two files" and files:
+    try:
+        files = sorted(files, key=lambda f: f.name)
+        if len(files) < 2:
+            st.info("Upload at least two files to build a time series.")
+        else:
+            # cached files are reused, the rest are parsed in parallel worker processes
+            try:
+                _, frames = parse_uploads(files)
+            except MissingColumnsError:
+                frames = None
+
+            if frames is None:
+                st.error("❌ Missing required columns. Make sure every file has: Stock Name, Symbol, % Chg, Price.")
+            else:
+                cube = build_cube(frames, [f.name.rsplit(".", 1)[0] for f in files])
+                for f, frame in zip(files, frames):
+                    show_bad_cells(f.name, frame)
+                st.success(f"✅ Aligned {cube.shape[0]} snapshots × {cube.shape[1]} symbols")
+
+                c1, c2 = st.columns(2)
+                metric = c1.selectbox("Metric", METRICS)
+                view = c2.selectbox("View", VIEWS, index=1)
+                st.dataframe(cube.to_frame(metric, view), use_container_width=True)
+
+                st.subheader("First → last snapshot")
+                st.dataframe(cube.summary(), use_container_width=True)
+
+    except Exception as e:
+        st.error(f"⚠️ Error: {e}")
+
+show_ingest_report()
+
+stats = upload_cache.stats()
+st.sidebar.subheader("Upload cache")
+c1, c2, c3 = st.sidebar.columns(3)
+c1.metric("Hits", stats["hits"])
+c2.metric("Disk hits", stats["disk_hits"])
+c3.metric("Misses", stats["misses"])
+st.sidebar.caption(f"{stats['entries']} parsed file(s) in memory, {stats['memory_mb']:.1f} MB")
+
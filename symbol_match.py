@@ -0,0 +1,219 @@
+"""
+symbol_match.py
+Looser matching for the rows the exact (Stock Name, Symbol) join leaves over.
+
+Exports from different days or vendors disagree on trivia: "infy " vs
+"INFY", "INFY-EQ" vs "INFY", "Infosys Ltd." vs "Infosys Limited", or a
+company renamed under the same symbol. Those rows used to fall out of the
+comparison. The leftovers go through three steps, each on what the
+previous one left:
+
+  normalized  equal normalized symbol and name (case, spaces, punctuation,
+              exchange suffixes like -EQ/.NS, and Ltd/Limited/Inc... dropped)
+  symbol      equal normalized symbol, different name (renames); the
+              confidence drops with name similarity
+  fuzzy       (fuzzy mode only) name/symbol similarity within candidate
+              blocks, one-to-one, best pairs first
+
+Fuzzy never scores all pairs. Rows are put into blocks by adaptive prefixes
+of the normalized symbol and name (a block that is still too big is split on
+a longer prefix) and by rare name tokens (tokens in too many rows are
+skipped). Only pairs that share a block are scored, so work grows with
+rows x block size rather than rows squared. Scoring is a cheap trigram Dice
+filter, then difflib's ratio (which forgives a transposed letter) for the
+pairs that pass it.
+
+Confidence: 1.0 exact, 0.98 normalized, 0.7-1.0 symbol, the score (>=
+FUZZY_THRESHOLD) for fuzzy.
+"""
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+MODES = ["exact", "normalized", "fuzzy"]
+
+# exchange/series suffixes: INFY-EQ, INFY.NS, INFY BE ...
+SYMBOL_SUFFIX = r"(?:[-.\s](?:EQ|BE|BZ|BL|SM|ST|NS|BO|NSE|BSE))+$"
+# words that don't tell companies apart
+NAME_NOISE = r"\b(?:the|ltd|limited|pvt|private|inc|incorporated|corp|corporation|co|company|plc|llc)\b"
+
+NORMALIZED_CONFIDENCE = 0.98
+SYMBOL_CONFIDENCE = 0.7  # + 0.3 x name similarity
+FUZZY_THRESHOLD = 0.85
+NAME_WEIGHT = 0.7  # fuzzy score = 0.7 x name similarity + 0.3 x symbol similarity
+PREFILTER = 0.5  # trigram Dice below this is never a match, skip the exact ratio
+MIN_PREFIX = 3
+MAX_PREFIX = 8
+MAX_BLOCK = 16  # rows per side before a block is split further (or, for tokens, skipped)
+
+
+def normalize_symbols(values) -> np.ndarray:
+    s = pd.Series(values, dtype="string").str.strip().str.upper()
+    s = s.str.replace(SYMBOL_SUFFIX, "", regex=True).str.replace(r"[^A-Z0-9&]", "", regex=True)
+    return s.fillna("").to_numpy(dtype=object)
+
+
+def normalize_names(values) -> np.ndarray:
+    s = pd.Series(values, dtype="string").str.lower().str.replace("&", " and ", regex=False)
+    s = s.str.replace(r"[^a-z0-9 ]", " ", regex=True).str.replace(NAME_NOISE, " ", regex=True)
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+    return s.fillna("").to_numpy(dtype=object)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2)) if text else frozenset()
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def _ratio(a, b):
+    return SequenceMatcher(None, a, b, autojunk=False).ratio() if a and b else 0.0
+
+
+class Keys:
+    """Normalized keys of one snapshot (built once per file, reused across comparisons)."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.symbols = normalize_symbols(frame["Symbol"])
+        self.names = normalize_names(frame["Stock Name"])
+        self.both = np.where((self.symbols == "") | (self.names == ""), "", self.symbols + "\x1f" + self.names)
+        self._grams = {}
+
+    def grams(self, pos):
+        """Trigram sets of (name, symbol) for row pos, computed on first use."""
+        g = self._grams.get(pos)
+        if g is None:
+            g = self._grams[pos] = (_trigrams(self.names[pos]), _trigrams(self.symbols[pos]))
+        return g
+
+
+class Matches:
+    def __init__(self, lpos, rpos, confidence, method):
+        self.lpos = np.asarray(lpos, dtype=np.int64)
+        self.rpos = np.asarray(rpos, dtype=np.int64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.method = np.asarray(method, dtype=object)
+
+    def __len__(self):
+        return len(self.lpos)
+
+
+def _join_on(lkeys, rkeys, lfree, rfree):
+    """(lpos, rpos) pairs with equal non-empty keys; on the left the first row of a key wins."""
+    lk = pd.Index(lkeys[lfree])
+    first = ~lk.duplicated() & (lk != "")
+    index = pd.Index(lk[first])
+    left_at = lfree[first]
+    hit = index.get_indexer(rkeys[rfree])
+    ok = (hit >= 0) & (rkeys[rfree] != "")
+    return left_at[hit[ok]], rfree[ok]
+
+
+def _prefix_blocks(lvals, rvals, lfree, rfree):
+    """Blocks of (left rows, right rows) sharing a prefix, split until they're small."""
+    pending = [(lfree, rfree)]
+    for k in range(MIN_PREFIX, MAX_PREFIX + 1):
+        split = []
+        for lrows, rrows in pending:
+            groups = defaultdict(lambda: ([], []))
+            for pos in lrows:
+                groups[lvals[pos][:k]][0].append(pos)
+            for pos in rrows:
+                key = rvals[pos][:k]
+                if key in groups:
+                    groups[key][1].append(pos)
+            for key, (ls, rs) in groups.items():
+                if not rs or len(key) < min(k, MIN_PREFIX):
+                    continue
+                if len(ls) <= MAX_BLOCK and len(rs) <= MAX_BLOCK:
+                    yield ls, rs
+                elif len(key) == k:  # still too big: try a longer prefix
+                    split.append((ls, rs))
+        pending = split
+        if not pending:
+            return
+
+
+def _token_blocks(lnames, rnames, lfree, rfree):
+    """Blocks of rows sharing a name token that few rows have."""
+    tokens = defaultdict(lambda: ([], []))
+    for side, names, rows in ((0, lnames, lfree), (1, rnames, rfree)):
+        for pos in rows:
+            for tok in set(names[pos].split()):
+                if len(tok) >= 3:
+                    tokens[tok][side].append(pos)
+    for ls, rs in tokens.values():
+        if ls and rs and len(ls) <= MAX_BLOCK and len(rs) <= MAX_BLOCK:
+            yield ls, rs
+
+
+def _fuzzy(left: Keys, right: Keys, lfree, rfree, threshold):
+    scores = {}
+    blocks = (
+        _prefix_blocks(left.symbols, right.symbols, lfree, rfree),
+        _prefix_blocks(left.names, right.names, lfree, rfree),
+        _token_blocks(left.names, right.names, lfree, rfree),
+    )
+    for source in blocks:
+        for ls, rs in source:
+            for lp in ls:
+                lname, lsym = left.grams(lp)
+                for rp in rs:
+                    if (lp, rp) in scores:
+                        continue
+                    rname, rsym = right.grams(rp)
+                    if NAME_WEIGHT * _dice(lname, rname) + (1 - NAME_WEIGHT) * _dice(lsym, rsym) < PREFILTER:
+                        scores[(lp, rp)] = 0.0
+                        continue
+                    scores[(lp, rp)] = (NAME_WEIGHT * _ratio(left.names[lp], right.names[rp])
+                                        + (1 - NAME_WEIGHT) * _ratio(left.symbols[lp], right.symbols[rp]))
+
+    # best pairs first, each row used once
+    lused, rused = set(), set()
+    out = []
+    for (lp, rp), score in sorted(scores.items(), key=lambda kv: -kv[1]):
+        if score < threshold:
+            break
+        if lp in lused or rp in rused:
+            continue
+        lused.add(lp)
+        rused.add(rp)
+        out.append((lp, rp, score))
+    return out
+
+
+def match_leftovers(left: Keys, right: Keys, lfree, rfree, fuzzy=False, threshold=FUZZY_THRESHOLD) -> Matches:
+    """Match rows lfree of the left snapshot to rows rfree of the right one."""
+    lfree = np.asarray(lfree, dtype=np.int64)
+    rfree = np.asarray(rfree, dtype=np.int64)
+    lpos, rpos, conf, method = [], [], [], []
+
+    def take(lp, rp, c, how):
+        nonlocal lfree, rfree
+        lpos.append(lp)
+        rpos.append(rp)
+        conf.append(np.broadcast_to(np.asarray(c, dtype=np.float64), len(lp)))
+        method.append(np.full(len(lp), how, dtype=object))
+        lfree = np.setdiff1d(lfree, lp)
+        rfree = np.setdiff1d(rfree, rp)
+
+    lp, rp = _join_on(left.both, right.both, lfree, rfree)
+    take(lp, rp, NORMALIZED_CONFIDENCE, "normalized")
+
+    lp, rp = _join_on(left.symbols, right.symbols, lfree, rfree)
+    sim = np.array([_ratio(left.names[a], right.names[b]) for a, b in zip(lp, rp)], dtype=np.float64)
+    take(lp, rp, SYMBOL_CONFIDENCE + (1 - SYMBOL_CONFIDENCE) * sim, "symbol")
+
+    if fuzzy and len(lfree) and len(rfree):
+        found = _fuzzy(left, right, lfree, rfree, threshold)
+        if found:
+            a, b, c = map(np.array, zip(*found))
+            take(a, b, c, "fuzzy")
+
+    return Matches(np.concatenate(lpos), np.concatenate(rpos), np.concatenate(conf), np.concatenate(method))
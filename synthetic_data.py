@@ -0,0 +1,136 @@
+"""
+synthetic_data.py
+Synthetic stock screener exports for benchmarks and manual testing.
+
+Workbooks look like the real exports: a title row, then a header with
+Stock Name / Symbol / % Chg / Price scattered among filler columns. A pair
+shares a configurable fraction of symbols, and a fraction of numeric cells
+can be "dirty" (thousand separators, signs, percent, currency, dashes). With
+messy > 0 some keys of the second export are spelled differently (case,
+spaces, -EQ suffixes, Ltd/Limited, renames, typos), as vendors do.
+
+Usage:
+    python synthetic_data.py --rows 50000 --overlap 0.9 --dirty 0.02 -o data/
+"""
+
+import argparse
+import os
+import random
+from io import BytesIO
+
+import openpyxl
+
+
+def _dirty(value, rnd):
+    """A messy spreadsheet spelling of `value` (or of a missing value)."""
+    kind = rnd.randrange(7)
+    if kind == 0:
+        return f"{value:,.2f}"
+    if kind == 1:
+        return f"{value:+.2f}%"
+    if kind == 2:
+        return f"({abs(value):.2f})" if value < 0 else f"{value:.2f}"
+    if kind == 3:
+        return f"₹ {value:,.2f}"
+    if kind == 4:
+        return f" {value:.2f} "
+    return rnd.choice(["—", "-", "N/A", ""])
+
+
+def _name(sym):
+    return f"{sym.title()} Industries Ltd"
+
+
+def _messy(sym, rnd):
+    """(symbol, name) for `sym` as another export might spell them."""
+    name = _name(sym)
+    kind = rnd.randrange(5)
+    if kind == 0:
+        return f" {sym.lower()} ", name
+    if kind == 1:
+        return f"{sym}-EQ", name.upper()
+    if kind == 2:
+        return sym, name.replace("Ltd", "Limited.")
+    if kind == 3:
+        return sym, f"{sym.title()} Holdings Ltd"  # renamed
+    i = rnd.randrange(len(sym) + 1, len(name) - 2)  # relisted under a new symbol, typo after the symbol part
+    return sym + "N", name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def numeric_column(rows, dirty=0.0, seed=0, low=-10, high=5000) -> list:
+    """Raw cell values of one numeric column, as openpyxl would hand them over."""
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(rows):
+        value = round(rnd.uniform(low, high), 2)
+        out.append(_dirty(value, rnd) if dirty and rnd.random() < dirty else value)
+    return out
+
+
+def make_workbook(rows, extra_cols=0, symbols=None, dirty=0.0, seed=0, title=True, names=None) -> bytes:
+    """One export as .xlsx bytes. `symbols` defaults to SYM0..SYM{rows-1}."""
+    rnd = random.Random(seed)
+    if symbols is None:
+        symbols = [f"SYM{i}" for i in range(rows)]
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    half = extra_cols // 2
+    extra = [f"Extra {i}" for i in range(extra_cols)]
+    if title:
+        ws.append(["Stock Screener Export"])
+    ws.append(["Stock Name", "Symbol"] + extra[:half] + ["% Chg", "Price"] + extra[half:])
+    if names is None:
+        names = [_name(sym) for sym in symbols]
+    for sym, stock_name in zip(symbols[:rows], names):
+        chg = round(rnd.uniform(-10, 10), 2)
+        price = round(rnd.uniform(10, 5000), 2)
+        if dirty and rnd.random() < dirty:
+            chg = _dirty(chg, rnd)
+        if dirty and rnd.random() < dirty:
+            price = _dirty(price, rnd)
+        filler = [round(rnd.uniform(0, 1000), 2) for _ in range(extra_cols)]
+        ws.append([stock_name, sym] + filler[:half] + [chg, price] + filler[half:])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def make_pair(rows, overlap=0.9, extra_cols=0, dirty=0.0, seed=0, messy=0.0):
+    """Two exports of `rows` rows each sharing round(rows * overlap) symbols;
+    a `messy` fraction of the shared keys is respelled in the second."""
+    second_names = None
+    rnd = random.Random(seed)
+    first = [f"SYM{i}" for i in range(rows)]
+    shared = rnd.sample(first, int(round(rows * overlap)))
+    second = shared + [f"NEW{i}" for i in range(rows - len(shared))]
+    rnd.shuffle(second)
+    if messy:
+        shared_set = set(shared)
+        keys = [_messy(sym, rnd) if sym in shared_set and rnd.random() < messy else (sym, _name(sym))
+                for sym in second]
+        second, second_names = [k[0] for k in keys], [k[1] for k in keys]
+    return (make_workbook(rows, extra_cols, first, dirty, seed=seed * 2 + 1),
+            make_workbook(rows, extra_cols, second, dirty, seed=seed * 2 + 2, names=second_names))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--overlap", type=float, default=0.9)
+    ap.add_argument("--dirty", type=float, default=0.0, help="fraction of numeric cells to garble")
+    ap.add_argument("--messy", type=float, default=0.0, help="fraction of shared keys to respell in file 2")
+    ap.add_argument("--extra-cols", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--out-dir", default=".")
+    args = ap.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for i, data in enumerate(make_pair(args.rows, args.overlap, args.extra_cols, args.dirty, args.seed, args.messy), start=1):
+        path = os.path.join(args.out_dir, f"synthetic_{i}.xlsx")
+        with open(path, "wb") as f:
+            f.write(data)
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
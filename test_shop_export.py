@@ -0,0 +1,60 @@
+"""
+test_shop_export.py
+The shop's CSV export layouts and export format detection.
+
+Run: python -m pytest -q test_shop_export.py
+"""
+
+import csv
+
+import pytest
+
+import shop_export
+from shop_db import Database
+from shop_migrations import migrate
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "shop.db"))
+    migrate(db)
+    db.execute("""INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty)
+                  VALUES ('Samsung', 'A52', '350000000000001', 7000, 9000, 3)""")
+    db.execute("""INSERT INTO sales (product_id, qty, date, customer, payment_mode, total_amount)
+                  VALUES (1, 1, '2024-05-01', 'A', 'Cash', 9000)""")
+    yield db
+    db.close()
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_exports_keep_the_original_layout(db, tmp_path):
+    path = str(tmp_path / "sales.csv")
+    assert shop_export.export(db, "sales", path, "2024-05-01", "2024-05-01") == 1
+    assert read_csv(path) == [["ID", "Brand", "Model", "Qty", "TotalAmount", "Customer", "PaymentMode", "Date"],
+                              ["1", "Samsung", "A52", "1", "9000.00", "A", "Cash", "2024-05-01"]]
+
+    path = str(tmp_path / "stock.csv")
+    shop_export.export(db, "stock", path)
+    assert read_csv(path) == [["ID", "Brand", "Model", "IMEI", "PurchasePrice", "SellingPrice", "StockQty", "StockValue"],
+                              ["1", "Samsung", "A52", "350000000000001", "7000.00", "9000.00", "3", "21000.00"]]
+
+
+def test_sales_detail_adds_cost_and_profit(db, tmp_path):
+    path = str(tmp_path / "detail.csv")
+    shop_export.export(db, "sales_detail", path)
+    header, row = read_csv(path)
+    assert dict(zip(header, row))["Profit"] == "2000.00"
+
+
+@pytest.mark.parametrize("name, fmt", [("a.csv", "csv"), ("A.CSV.GZ", "csv.gz"), ("dir/b.xlsx", "xlsx"),
+                                       ("report.xlsx.gz", None), ("c.gz", None), ("d.txt", None)])
+def test_format_for(name, fmt):
+    if fmt is None:
+        with pytest.raises(ValueError):
+            shop_export.format_for(name)
+    else:
+        assert shop_export.format_for(name) == fmt
@@ -0,0 +1,68 @@
+"""
+test_shop_import.py
+Bulk import of product and purchase invoices from CSV and Excel.
+
+Run: python -m pytest -q test_shop_import.py
+"""
+
+from datetime import date, datetime
+
+import openpyxl
+import pytest
+
+import shop_import
+from shop_db import Database
+from shop_migrations import migrate
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "shop.db"))
+    migrate(db)
+    yield db
+    db.close()
+
+
+def write_xlsx(path, rows):
+    wb = openpyxl.Workbook()
+    for row in rows:
+        wb.active.append(row)
+    wb.save(path)
+    return str(path)
+
+
+def test_products_with_vendor_get_purchase_lines_for_their_ids(db, tmp_path):
+    # a deleted row leaves a gap in the AUTOINCREMENT sequence
+    db.execute("INSERT INTO products (brand, model) VALUES ('Old', 'Gone')")
+    db.execute("DELETE FROM products")
+    path = tmp_path / "products.csv"
+    path.write_text("brand,model,imei,purchase_price,selling_price,qty\n"
+                    "Samsung,A52,350000000000001,20000,24000,3\n"
+                    "Boat,Earbuds,,800,1200,0\n"
+                    "Apple,iPhone 13,,50000,60000,2\n")
+    result = shop_import.import_products(db, str(path), vendor="V1")
+    assert result.inserted == 3 and len(result.rejected) == 0
+    lines = db.query("""SELECT p.model, u.qty FROM purchases u JOIN products p ON p.id = u.product_id
+                        ORDER BY p.id""")
+    assert [tuple(r) for r in lines] == [("A52", 3), ("iPhone 13", 2)]
+
+
+def test_excel_date_cells_are_read_as_dates(db, tmp_path):
+    db.execute("INSERT INTO products (brand, model, imei, stock_qty) VALUES ('Samsung', 'A52', '350000000000001', 0)")
+    path = write_xlsx(tmp_path / "invoice.xlsx", [
+        ["IMEI", "Qty", "Vendor", "Date"],
+        [350000000000001, 2, "V1", datetime(2024, 5, 1)],  # openpyxl reads date cells back as datetime
+    ])
+    result = shop_import.import_purchases(db, path)
+    assert result.inserted == 1 and len(result.rejected) == 0
+
+    path = write_xlsx(tmp_path / "invoice2.xlsx", [
+        ["product_id", "qty", "date"],
+        [1, 2, datetime(2024, 5, 1)],
+        [1.0, 1, date(2024, 5, 2)],
+        [1, 1, "2024-05-03"],
+    ])
+    result = shop_import.import_purchases(db, path)
+    assert result.inserted == 3 and len(result.rejected) == 0
+    assert [r[0] for r in db.query("SELECT date FROM purchases ORDER BY id")] == \
+        ["2024-05-01", "2024-05-01", "2024-05-02", "2024-05-03"]
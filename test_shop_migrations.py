@@ -0,0 +1,131 @@
+"""
+test_shop_migrations.py
+Schema migrations and the query plans they exist for.
+
+Run: python -m pytest -q test_shop_migrations.py
+"""
+
+import sqlite3
+
+import pytest
+
+from shop_db import Database
+from shop_migrations import check_plans, migrate, schema_version
+
+# what the app's original init_db() created (no user_version, no indexes)
+BASELINE_SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    brand TEXT,
+    model TEXT,
+    imei TEXT,
+    purchase_price REAL,
+    selling_price REAL,
+    stock_qty INTEGER DEFAULT 0
+);
+CREATE TABLE purchases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER,
+    qty INTEGER,
+    date TEXT,
+    vendor TEXT,
+    FOREIGN KEY(product_id) REFERENCES products(id)
+);
+CREATE TABLE sales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER,
+    qty INTEGER,
+    date TEXT,
+    customer TEXT,
+    payment_mode TEXT,
+    total_amount REAL,
+    FOREIGN KEY(product_id) REFERENCES products(id)
+);
+"""
+
+
+@pytest.fixture
+def open_db(tmp_path):
+    opened = []
+
+    def open_(name="shop.db"):
+        db = Database(str(tmp_path / name))
+        opened.append(db)
+        return db
+
+    yield open_
+    for db in opened:
+        db.close()
+
+
+def seed(db, products=200, days=60):
+    """A small shop's worth of rows: ANALYZE on a handful of rows makes a table scan look cheapest."""
+    with db.transaction() as conn:
+        conn.executemany("""INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty)
+                            VALUES (?, ?, ?, ?, ?, ?)""",
+                         [(f"Brand {i % 12}", f"Model {i}", f"86{i:013d}" if i % 4 else None, 1000 + i, 1200 + i, 50)
+                          for i in range(products)])
+        conn.executemany("INSERT INTO purchases (product_id, qty, date, vendor) VALUES (?, ?, ?, ?)",
+                         [(1 + i % products, 5, f"2024-{1 + i % 12:02d}-01", "V") for i in range(products * 3)])
+        conn.executemany("""INSERT INTO sales (product_id, qty, date, customer, payment_mode, total_amount)
+                            VALUES (?, ?, ?, ?, ?, ?)""",
+                         [(1 + i % products, 1, f"2024-{1 + d // 28:02d}-{1 + d % 28:02d}", "C", "Cash", 1200)
+                          for d in range(days) for i in range(d, d + 20)])
+
+
+def test_fresh_database_uses_its_indexes(open_db):
+    db = open_db()
+    migrate(db)
+    seed(db)
+    db.execute("ANALYZE")
+    assert check_plans(db) == []
+
+
+def test_product_changes_invalidate_cached_reports(open_db):
+    db = open_db()
+    migrate(db)
+    seed(db, products=3, days=1)
+    version = lambda: db.scalar("SELECT version FROM report_state")
+    before = version()
+    db.execute("UPDATE products SET model = 'Renamed' WHERE id = 1")
+    assert version() == before + 1
+    db.execute("UPDATE products SET stock_qty = stock_qty - 1 WHERE id = 1")
+    assert version() == before + 1
+    db.execute("DELETE FROM products WHERE id = 2")
+    assert version() == before + 2
+
+
+def test_baseline_file_is_upgraded_in_place(tmp_path, open_db):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO products (brand, model, imei, purchase_price, selling_price, stock_qty) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [("Samsung", "A52", " 350000000000001 ", 20000, 24000, 4), ("Boat", "Earbuds", "", 800, 1200, 28)])
+    conn.executemany("INSERT INTO sales (product_id, qty, date, customer, payment_mode, total_amount) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [(1, 1, "2024-01-05", "A", "Cash", 24000), (2, 2, "2024-01-05", "B", None, 2400),
+                      (1, 1, None, "C", "Cash", 24000), (None, 1, "2024-01-06", "D", "Cash", 500)])
+    conn.commit()
+    conn.close()
+
+    db = open_db("old.db")
+    assert schema_version(db) == 0
+    assert migrate(db) == [1, 2, 3, 4, 5, 6]
+    assert db.scalar("PRAGMA user_version") == 6
+    assert migrate(db) == []
+
+    # existing rows survive, cleaned up for the unique IMEI index
+    assert [tuple(r) for r in db.query("SELECT id, imei FROM products ORDER BY id")] == \
+        [(1, "350000000000001"), (2, None)]
+    # derived tables are built from the old data
+    assert db.scalar("SELECT product_count FROM shop_totals") == 2
+    assert db.scalar("SELECT amount FROM daily_sales WHERE date = '2024-01-05'") == 26400
+    # legacy sales without a date or product stay out of the rollup, and can still be deleted
+    assert db.scalar("SELECT SUM(cost) FROM sales_rollup") == 20000 + 2 * 800
+    assert db.scalar("SELECT SUM(lines) FROM sales_rollup") == 2
+    db.execute("DELETE FROM sales WHERE date IS NULL OR product_id IS NULL")
+    assert db.scalar("SELECT SUM(lines) FROM sales_rollup") == 2
+    seed(db)
+    db.execute("ANALYZE")
+    assert check_plans(db) == []
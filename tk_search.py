@@ -0,0 +1,130 @@
+"""
+tk_search.py
+Type-ahead product picker for the sales and inward windows.
+
+An Entry with a drop-down Listbox of matches from shop_search.ProductSearch.
+Searches are debounced (one query once typing pauses), and each one is an
+indexed FTS lookup, so it runs on the Tk thread without a noticeable delay.
+A 14-16 digit entry followed by Enter, which is what a barcode scanner
+sends, is looked up as an exact IMEI and picked straight away.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from shop_search import label, looks_like_imei
+from sql_profiler import timed
+
+NAV_KEYS = {"Up", "Down", "Return", "KP_Enter", "Escape", "Tab", "ISO_Left_Tab"}
+
+
+class ProductPicker(ttk.Frame):
+    def __init__(self, master, search, width=45, on_pick=None, on_scan=None, delay_ms=150, limit=15, **kw):
+        super().__init__(master, **kw)
+        self.search = search
+        self.on_pick = on_pick
+        self.on_scan = on_scan
+        self.delay_ms = delay_ms
+        self.limit = limit
+        self.selected = None
+        self._rows = []
+        self._after = None
+
+        self.var = tk.StringVar()
+        self.entry = ttk.Entry(self, textvariable=self.var, width=width)
+        self.entry.grid(row=0, column=0, sticky=tk.EW)
+        self.listbox = tk.Listbox(self, height=8, width=width, activestyle="dotbox")
+        self.columnconfigure(0, weight=1)
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", self._on_return)
+        self.entry.bind("<KP_Enter>", self._on_return)
+        self.entry.bind("<Down>", self._into_list)
+        self.entry.bind("<Escape>", lambda e: self._hide())
+        self.listbox.bind("<Return>", lambda e: self._pick_current())
+        self.listbox.bind("<Double-Button-1>", lambda e: self._pick_current())
+        self.listbox.bind("<Escape>", lambda e: (self._hide(), self.entry.focus_set()))
+
+    # ---- public API ----
+    def get(self):
+        """The picked product row, or None if the text no longer matches a pick."""
+        if self.selected is not None and self.var.get() == label(self.selected):
+            return self.selected
+        return None
+
+    def clear(self):
+        self._cancel_pending()
+        self.selected = None
+        self.var.set("")
+        self._hide()
+        self.entry.focus_set()
+
+    # ---- internals ----
+    def _cancel_pending(self):
+        if self._after is not None:
+            self.after_cancel(self._after)
+            self._after = None
+
+    def _on_key(self, event):
+        if event.keysym in NAV_KEYS:
+            return
+        self._cancel_pending()
+        self._after = self.after(self.delay_ms, self._run_search)
+
+    @timed("product_search")
+    def _run_search(self):
+        self._after = None
+        text = self.var.get()
+        if self.selected is not None and text == label(self.selected):
+            return
+        self._rows = self.search.search(text, self.limit) if text.strip() else []
+        self.listbox.delete(0, tk.END)
+        for row in self._rows:
+            self.listbox.insert(tk.END, label(row))
+        if self._rows:
+            self.listbox.grid(row=1, column=0, sticky=tk.EW)
+        else:
+            self._hide()
+
+    def _hide(self):
+        self.listbox.grid_remove()
+
+    def _into_list(self, event):
+        if self._rows:
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        return "break"
+
+    def _on_return(self, event):
+        self._cancel_pending()
+        text = self.var.get()
+        if looks_like_imei(text):
+            row = self.search.by_imei(text)
+            if row is None:
+                self.bell()
+                return "break"
+            self._pick(row)
+            if self.on_scan:
+                self.on_scan(row)
+            return "break"
+        if self.get() is None:
+            self._run_search()
+            if self._rows:
+                self._pick(self._rows[0])
+        return "break"
+
+    def _pick_current(self):
+        sel = self.listbox.curselection()
+        if sel:
+            self._pick(self._rows[sel[0]])
+            self.entry.focus_set()
+
+    def _pick(self, row):
+        self.selected = row
+        self.var.set(label(row))
+        self.entry.icursor(tk.END)
+        self._hide()
+        if self.on_pick:
+            self.on_pick(row)
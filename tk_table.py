@@ -0,0 +1,168 @@
+"""
+tk_table.py
+A Treeview-based table that refreshes by diffing instead of rebuilding.
+
+DataTable.set_rows() compares the new rows with what is on screen, keyed by
+one column (the row id), and only deletes, inserts, updates or moves the
+items that changed. Above `virtual_threshold` rows the table goes virtual:
+only the rows that fit in the visible area are materialized as Treeview
+items, and the scrollbar / mouse wheel / arrow keys slide that window over
+the full row list, so a list of 100k sales costs the same to show as one
+of 50.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class DataTable(ttk.Frame):
+    def __init__(self, master, columns, key=0, height=10, virtual_threshold=1000, **kw):
+        """columns: [(name, heading, width)] or [(name, heading, width, anchor)].
+        key: index of the column that identifies a row (must be unique)."""
+        super().__init__(master, **kw)
+        names = [c[0] for c in columns]
+        self.tree = ttk.Treeview(self, columns=names, show="headings", height=height, selectmode="browse")
+        for name, heading, width, *anchor in columns:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor=anchor[0] if anchor else tk.CENTER)
+        self.vsb = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.key = key
+        self.virtual_threshold = virtual_threshold
+        self._rows = []      # every row, in display order
+        self._index = {}     # key -> position in _rows
+        self._shown = {}     # iid -> values currently in the Treeview
+        self._start = 0      # first row of the window (virtual mode)
+        self._visible = height
+        self.virtual = False
+
+        self.tree.bind("<Configure>", self._on_resize)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self._on_wheel)
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+
+    # ---- public API ----
+    def set_rows(self, rows):
+        """Show `rows` (sequences of display values); unchanged items are left alone."""
+        self._rows = [tuple("" if v is None else v for v in r) for r in rows]
+        self._index = {str(r[self.key]): i for i, r in enumerate(self._rows)}
+        self.virtual = len(self._rows) > self.virtual_threshold
+        self._render()
+
+    def selected(self):
+        """Values of the selected row, or None."""
+        iid = self.tree.focus()
+        pos = self._index.get(iid)
+        return self._rows[pos] if iid and pos is not None else None
+
+    def selected_key(self):
+        row = self.selected()
+        return row[self.key] if row else None
+
+    def see(self, key):
+        """Scroll so the row with this key is visible."""
+        pos = self._index.get(str(key))
+        if pos is None:
+            return
+        if self.virtual and not self._start <= pos < self._start + self._visible:
+            self._scroll_to(pos - self._visible // 2)
+        self.tree.see(str(key))
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ---- rendering ----
+    def _window(self):
+        if not self.virtual:
+            return self._rows
+        self._start = max(0, min(self._start, len(self._rows) - self._visible))
+        return self._rows[self._start:self._start + self._visible]
+
+    def _render(self):
+        tree = self.tree
+        want = self._window()
+        ids = [str(r[self.key]) for r in want]
+        new = dict(zip(ids, want))
+        gone = [iid for iid in self._shown if iid not in new]
+        if gone:
+            tree.delete(*gone)
+        for pos, iid in enumerate(ids):
+            old = self._shown.get(iid)
+            if old is None:
+                tree.insert("", pos, iid=iid, values=new[iid])
+            elif old != new[iid]:
+                tree.item(iid, values=new[iid])
+        # inserts landed at their final positions; only a reordering needs moves
+        if list(tree.get_children()) != ids:
+            for pos, iid in enumerate(ids):
+                tree.move(iid, "", pos)
+        self._shown = new
+        if self.virtual:
+            n = len(self._rows)
+            self.vsb.set(self._start / n, min(1.0, (self._start + self._visible) / n))
+
+    def _scroll_to(self, start):
+        start = max(0, min(start, len(self._rows) - self._visible))
+        if start != self._start:
+            self._start = start
+            self._render()
+
+    # ---- scrolling (virtual mode drives the scrollbar itself) ----
+    def _on_tree_scroll(self, first, last):
+        if not self.virtual:
+            self.vsb.set(first, last)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if not self.virtual:
+            if unit:
+                self.tree.yview(action, amount, unit)
+            else:
+                self.tree.yview(action, amount)
+            return
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self._rows)))
+        else:
+            step = self._visible if unit == "pages" else 1
+            self._scroll_to(self._start + int(amount) * step)
+
+    def _on_wheel(self, event):
+        if not self.virtual:
+            return None
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_to(self._start - 3)
+        else:
+            self._scroll_to(self._start + 3)
+        return "break"
+
+    def _on_arrow(self, step):
+        # at the edge of the window, slide it instead of letting the Treeview stop
+        if not self.virtual:
+            return None
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if not children or focus != (children[0] if step < 0 else children[-1]):
+            return None
+        pos = self._index[focus] + step
+        if not 0 <= pos < len(self._rows):
+            return "break"
+        self._scroll_to(self._start + step)
+        iid = str(self._rows[pos][self.key])
+        self.tree.focus(iid)
+        self.tree.selection_set(iid)
+        return "break"
+
+    def _on_resize(self, event):
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if not bbox:
+            return
+        _, top, _, row_h = bbox
+        visible = max(1, (event.height - top) // max(1, row_h))
+        if visible != self._visible:
+            self._visible = visible
+            if self.virtual:
+                self._render()
@@ -0,0 +1,188 @@
+"""
+tk_tasks.py
+Run database and file work off the Tk event loop.
+
+TaskRunner executes callables on a small thread pool and hands results back
+on the Tk thread by polling a queue with widget.after(), so callbacks may
+touch widgets and the worker functions never do. Tasks can be cancelled:
+a queued task is dropped, a running one stops at its next checkpoint()
+call; one that finishes anyway still gets its on_done, since its work is
+done. Writes are submitted with cancellable=False, which cancel() and
+cancel_all() leave alone: they have no checkpoints, so cancelling one would
+only hide a commit that happens regardless. A task can report(done, total) as it goes; the latest value is handed
+to its on_progress callback on the Tk thread. An on_busy(count) hook lets
+the UI show a busy indicator while work is in flight.
+
+SQLite: workers go through shop_db.Database, which opens one connection per
+thread, so no connection is ever shared between threads. WAL lets the
+readers run alongside a writer; writers queue on busy_timeout.
+
+Profiling (SQL_PROFILE=1): a task submitted with a label is recorded as a UI
+path in sql_profiler, timed from submit() until its on_done has updated the
+widgets, so queue wait and the Tk side are counted along with the queries.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sql_profiler
+
+POLL_MS = 40
+
+_current = threading.local()
+
+
+class Cancelled(Exception):
+    pass
+
+
+def checkpoint():
+    """Call from inside a task's loop; raises Cancelled once the task is cancelled."""
+    task = getattr(_current, "task", None)
+    if task is not None and task.cancelled:
+        raise Cancelled()
+
+
+def report(done, total=None):
+    """Progress from inside a task (also a cancellation checkpoint)."""
+    task = getattr(_current, "task", None)
+    if task is not None:
+        task.progress = (done, total)
+    checkpoint()
+
+
+class Task:
+    def __init__(self, label, owner, on_progress=None, cancellable=True):
+        self.label = label
+        self.cancellable = cancellable
+        self.owner = owner
+        self.on_progress = on_progress
+        self.progress = None  # set by the worker, read on the Tk thread
+        self._shown = None
+        self._cancel = threading.Event()
+        self.done = False
+        self.started = time.perf_counter()
+
+    def cancel(self):
+        if self.cancellable:
+            self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+class TaskRunner:
+    def __init__(self, root, workers=2, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tk-task")
+        self._results = queue.Queue()
+        self._pending = set()
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, owner=None, label="",
+               cancellable=True, **kwargs) -> Task:
+        """Run fn(*args, **kwargs) on a worker thread.
+
+        on_done(result) / on_error(exc) run on the Tk thread. They are skipped
+        if the task was cancelled before it started or stopped at a
+        checkpoint, or if `owner` (e.g. the Toplevel that asked) has been
+        destroyed meanwhile. Without on_error, errors go to the root's
+        report_callback_exception like any other Tk callback error.
+        cancellable=False for writes: cancel()/cancel_all() won't touch them,
+        and their callbacks run even when the owner is gone (a commit or a
+        failure must not go unreported), so they must check the owner before
+        touching its widgets.
+        """
+        task = Task(label, owner, on_progress, cancellable)
+        self._pending.add(task)
+        self._pool.submit(self._run, task, fn, args, kwargs, on_done, on_error)
+        self._busy_changed()
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+        return task
+
+    def cancel_all(self):
+        for task in list(self._pending):
+            task.cancel()
+
+    @property
+    def busy(self):
+        return len(self._pending)
+
+    def shutdown(self):
+        self.cancel_all()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    # ---- worker side ----
+    def _run(self, task, fn, args, kwargs, on_done, on_error):
+        if task.cancelled:
+            self._results.put((task, None, None, None, Cancelled()))
+            return
+        _current.task = task
+        try:
+            result = fn(*args, **kwargs)
+            self._results.put((task, on_done, on_error, result, None))
+        except BaseException as e:
+            self._results.put((task, on_done, on_error, None, e))
+        finally:
+            _current.task = None
+
+    # ---- Tk side ----
+    def _poll(self):
+        try:
+            for task in list(self._pending):
+                progress = task.progress
+                if task.on_progress and progress is not None and progress != task._shown:
+                    task._shown = progress
+                    self._callback(self._progress, task, progress)
+            while True:
+                try:
+                    item = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                task = item[0]
+                task.done = True
+                self._pending.discard(task)
+                self._busy_changed()
+                self._callback(self._deliver, *item)
+                if task.label:
+                    sql_profiler.record_path(task.label, time.perf_counter() - task.started)
+        finally:
+            # keep polling whatever a callback did, or no later result would ever arrive
+            if self._pending:
+                self.root.after(POLL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def _progress(self, task, progress):
+        if task.owner is None or task.owner.winfo_exists():
+            task.on_progress(*progress)
+
+    def _deliver(self, task, on_done, on_error, result, error):
+        if isinstance(error, Cancelled):  # never started, or stopped at a checkpoint
+            return
+        if task.cancellable and task.owner is not None and not task.owner.winfo_exists():
+            return
+        if error is None:
+            if on_done:
+                on_done(result)
+        elif on_error:
+            on_error(error)
+        else:
+            self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    def _callback(self, fn, *args):
+        """Run a UI callback; its errors are reported like any Tk callback error."""
+        try:
+            fn(*args)
+        except Exception as e:
+            self.root.report_callback_exception(type(e), e, e.__traceback__)
+
+    def _busy_changed(self):
+        if self.on_busy:
+            self._callback(self.on_busy, len(self._pending))
@@ -0,0 +1,180 @@
+"""
+upload_cache.py
+Content-addressed cache of parsed uploads.
+
+Frames are keyed by a hash of the uploaded bytes, kept in an in-memory LRU
+and written through to Parquet files on disk, so re-uploading a workbook we
+have already seen (even after a restart) skips parsing entirely. Both tiers
+are size bounded and evict least-recently-used entries first.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_DIR = os.environ.get("COMPARATOR_CACHE_DIR",
+                             os.path.join(tempfile.gettempdir(), "excel_comparator_cache"))
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+DEFAULT_DISK_LIMIT = 2 * 1024 * 1024 * 1024
+
+
+def content_key(data: bytes, tag: str = "") -> str:
+    """Hash of the raw upload; `tag` separates results of different parsers."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(tag.encode("utf-8"))
+    h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+class UploadCache:
+    """Two-tier (memory + Parquet) LRU cache of DataFrames.
+
+    Returned frames are shared between callers and must not be modified in place.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, memory_limit=DEFAULT_MEMORY_LIMIT, disk_limit=DEFAULT_DISK_LIMIT):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._mem = OrderedDict()  # key -> (frame, nbytes)
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ---- public API ----
+    def get_or_parse(self, data: bytes, parse, tag: str = ""):
+        """Return (key, frame), calling parse(data) only on a cache miss."""
+        key = content_key(data, tag)
+        frame = self.get(key)
+        if frame is None:
+            with self._lock:
+                self.misses += 1
+            frame = parse(data)
+            self.put(key, frame)
+        return key, frame
+
+    def get_or_parse_many(self, payloads, parse_many, tag: str = ""):
+        """Like get_or_parse for a batch; all misses go to one parse_many(list) call."""
+        keys = [content_key(data, tag) for data in payloads]
+        frames = [self.get(key) for key in keys]
+        todo = [i for i, frame in enumerate(frames) if frame is None]
+        if todo:
+            with self._lock:
+                self.misses += len(todo)
+            for i, frame in zip(todo, parse_many([payloads[i] for i in todo])):
+                self.put(keys[i], frame)
+                frames[i] = frame
+        return keys, frames
+
+    def get(self, key):
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        frame = self._load(key)
+        if frame is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._remember(key, frame)
+        return frame
+
+    def put(self, key, frame: pd.DataFrame):
+        with self._lock:
+            self._remember(key, frame)
+        self._spill(key, frame)
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+        for path, _, _ in self._disk_entries():
+            os.remove(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._mem),
+                "memory_mb": self._mem_bytes / 1e6,
+            }
+
+    # ---- memory tier ----
+    def _remember(self, key, frame):
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= old[1]
+        self._mem[key] = (frame, nbytes)
+        self._mem_bytes += nbytes
+        while self._mem_bytes > self.memory_limit and len(self._mem) > 1:
+            _, (_, evicted) = self._mem.popitem(last=False)
+            self._mem_bytes -= evicted
+
+    # ---- disk tier ----
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".parquet")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            frame = pd.read_parquet(path)
+            os.utime(path)  # mtime doubles as the disk LRU clock
+        except (OSError, ValueError):
+            return None
+        return frame
+
+    def _spill(self, key, frame):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            frame.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except (OSError, ValueError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        if not self.directory:
+            return entries
+        for name in os.listdir(self.directory):
+            if not name.endswith(".parquet"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_mtime, st.st_size))
+        return entries
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda e: e[1])
+        total = sum(e[2] for e in entries)
+        for path, _, size in entries[:-1]:
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size